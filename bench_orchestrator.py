@@ -0,0 +1,296 @@
+import os
+import sys
+import argparse
+import time
+import io
+import json
+import random
+import shutil
+import tarfile
+import tempfile
+import platform
+import subprocess
+import threading
+import contextlib
+import http.server
+from functools import partial
+
+import build_linux_mac
+
+# Stand-in for configure and gmake: prints lines of the given width at a controlled rate
+STAND_IN = '''#!{python}
+import sys
+import time
+
+lines = int(sys.argv[1])
+rate = float(sys.argv[2])
+width = int(sys.argv[3])
+kind = sys.argv[4]
+
+out = sys.stdout
+start = time.time()
+for i in range(lines):
+    if kind == 'configure':
+        line = f'checking for feature_{{i}}... yes'
+    else:
+        line = f'g++ -c -g -O2 -DIN_GCC -DCROSS_DIRECTORY_STRUCTURE -I. -I../../gcc/gcc src/file_{{i}}.cc -o file_{{i}}.o'
+    out.write(line.ljust(width, ' ')[:width] + '\\n')
+    if rate and i % 64 == 63:
+        out.flush()
+        delay = start + (i + 1) / rate - time.time()
+        if delay > 0:
+            time.sleep(delay)
+out.flush()
+'''
+
+# Approximate file counts of the real source tarballs
+TARBALLS = {
+    'binutils-2.43.tar.gz': 21000,
+    'gdb-15.2.tar.gz': 26000,
+    'gcc-14.2.0.tar.gz': 140000,
+    'mingw-w64-v12.0.0.tar.bz2': 15000,
+    'mtools-4.0.45.tar.gz': 300
+}
+
+class QuietHandler(http.server.SimpleHTTPRequestHandler):
+    def log_message(self, format, *args):
+        pass
+
+class Sink(io.TextIOBase):
+    def __init__(self):
+        self.bytes = 0
+
+    def write(self, s):
+        self.bytes += len(s)
+        return len(s)
+
+def write_stand_ins(directory):
+    for name in ['configure', 'gmake']:
+        path = os.path.join(directory, name)
+        f = open(path, 'w')
+        f.write(STAND_IN.format(python=sys.executable))
+        f.close()
+        os.chmod(path, 0o755)
+
+def get_payload(rng, size):
+    # Half random, half repetitive text, compresses roughly like source code and binaries
+    noise = rng.randbytes(size // 2)
+    text = (b'static inline int function_name(struct tree_node *node) { return 0; }\n' * (size // 140 + 1))[:size - len(noise)]
+    return noise + text
+
+def bench_subprocess_output(directory, kind, lines, rate, width):
+    sink = Sink()
+    start = time.time()
+    cpu_start = time.process_time()
+    p = subprocess.Popen(f'{directory}/{kind} {lines} {rate} {width} {kind}',
+                         stdout=subprocess.PIPE,
+                         shell=True)
+    with contextlib.redirect_stdout(sink):
+        build_linux_mac.get_subprocess_output(p)
+    duration = time.time() - start
+    cpu = time.process_time() - cpu_start
+    return {
+        'lines': lines,
+        'bytes': sink.bytes,
+        'rate': rate,
+        'seconds': duration,
+        'lines_per_second': lines / duration,
+        'mb_per_second': sink.bytes / (1024 * 1024 * duration),
+        'cpu_seconds': cpu,
+        'cpu_percent': cpu * 100 / duration
+    }
+
+def make_tarballs(directory, scale, rng):
+    os.makedirs(directory, exist_ok=True)
+    total_files = 0
+    for filename, count in TARBALLS.items():
+        count = max(1, int(count * scale))
+        mode = 'w:bz2' if filename.endswith('.bz2') else 'w:gz'
+        root = filename.split('.tar.')[0]
+        tar_file = tarfile.open(os.path.join(directory, filename), mode)
+        for i in range(count):
+            data = get_payload(rng, rng.randint(256, 16384))
+            info = tarfile.TarInfo(f'{root}/dir_{i // 200}/file_{i}.c')
+            info.size = len(data)
+            info.mtime = 0
+            tar_file.addfile(info, io.BytesIO(data))
+        tar_file.close()
+        total_files += count
+    return total_files
+
+def bench_extract(directory, scale, rng):
+    work = os.path.join(directory, 'extract')
+    files = make_tarballs(os.path.join(work, 'tarballs'), scale, rng)
+    tarball_bytes = sum(os.path.getsize(os.path.join(work, 'tarballs', f)) for f in os.listdir(os.path.join(work, 'tarballs')))
+
+    cwd = os.getcwd()
+    os.chdir(work)
+    start = time.time()
+    try:
+        with contextlib.redirect_stdout(Sink()):
+            build_linux_mac.extract_sources()
+    finally:
+        os.chdir(cwd)
+    duration = time.time() - start
+
+    return {
+        'files': files,
+        'tarball_bytes': tarball_bytes,
+        'seconds': duration,
+        'files_per_second': files / duration,
+        'mb_per_second': tarball_bytes / (1024 * 1024 * duration)
+    }
+
+def make_prefix(directory, scale, rng):
+    # Roughly the layout of an installed elfgcc prefix: a few large executables and many headers
+    total_bytes = 0
+    layout = [
+        ('bin', 30, 1024 * 1024, 4 * 1024 * 1024),
+        ('libexec/gcc/x86_64-elf/14.2.0', 8, 8 * 1024 * 1024, 32 * 1024 * 1024),
+        ('lib/gcc/x86_64-elf/14.2.0/include', 2500, 512, 32 * 1024),
+        ('share/man/man1', 60, 4096, 65536)
+    ]
+    for subdir, count, low, high in layout:
+        os.makedirs(os.path.join(directory, subdir), exist_ok=True)
+        for i in range(max(1, int(count * scale))):
+            data = get_payload(rng, rng.randint(int(low * min(scale, 1)) or 1, int(high * min(scale, 1)) or 1))
+            f = open(os.path.join(directory, subdir, f'file_{i}'), 'wb')
+            f.write(data)
+            f.close()
+            total_bytes += len(data)
+    return total_bytes
+
+def bench_pack(directory, scale, rng):
+    prefix = os.path.join(directory, 'prefix')
+    archives = os.path.join(directory, 'archives')
+    os.makedirs(archives, exist_ok=True)
+    prefix_bytes = make_prefix(prefix, scale, rng)
+
+    start = time.time()
+    build_linux_mac.pack_compiler(archives, prefix, 'amd64', 'bench', 'elf')
+    duration = time.time() - start
+    archive_bytes = os.path.getsize(os.path.join(archives, 'amd64-bench-elf-gcc.tar.xz'))
+
+    return {
+        'prefix_bytes': prefix_bytes,
+        'archive_bytes': archive_bytes,
+        'ratio': archive_bytes / prefix_bytes,
+        'seconds': duration,
+        'mb_per_second': prefix_bytes / (1024 * 1024 * duration)
+    }
+
+def bench_download(directory, scale, rng):
+    mirror = os.path.join(directory, 'mirror')
+    tarballs = os.path.join(directory, 'extract', 'tarballs')
+    if not os.path.isdir(tarballs):
+        make_tarballs(tarballs, scale, rng)
+
+    # Same layout as ftp.gnu.org and the mingw-w64 sourceforge release directory
+    layout = {
+        'binutils-2.43.tar.gz': 'gnu/binutils',
+        'gdb-15.2.tar.gz': 'gnu/gdb',
+        'gcc-14.2.0.tar.gz': 'gnu/gcc/gcc-14.2.0',
+        'mingw-w64-v12.0.0.tar.bz2': 'mingw',
+        'mtools-4.0.45.tar.gz': 'gnu/mtools'
+    }
+    total_bytes = 0
+    for filename, subdir in layout.items():
+        os.makedirs(os.path.join(mirror, subdir), exist_ok=True)
+        shutil.copy(os.path.join(tarballs, filename), os.path.join(mirror, subdir, filename))
+        total_bytes += os.path.getsize(os.path.join(tarballs, filename))
+
+    server = http.server.ThreadingHTTPServer(('127.0.0.1', 0), partial(QuietHandler, directory=mirror))
+    thread = threading.Thread(target=server.serve_forever, daemon=True)
+    thread.start()
+    url = f'http://127.0.0.1:{server.server_address[1]}'
+
+    work = os.path.join(directory, 'download')
+    os.makedirs(work, exist_ok=True)
+    cwd = os.getcwd()
+    os.chdir(work)
+    start = time.time()
+    try:
+        with contextlib.redirect_stdout(Sink()):
+            build_linux_mac.download_sources('2.43', '15.2', '14.2.0', '12.0.0', '4.0.45', f'{url}/gnu', f'{url}/mingw')
+    finally:
+        os.chdir(cwd)
+        server.shutdown()
+        server.server_close()
+    duration = time.time() - start
+
+    return {
+        'files': len(layout),
+        'bytes': total_bytes,
+        'seconds': duration,
+        'mb_per_second': total_bytes / (1024 * 1024 * duration)
+    }
+
+def get_commit():
+    p = subprocess.run('git rev-parse HEAD',
+                       stdout=subprocess.PIPE,
+                       stderr=subprocess.DEVNULL,
+                       cwd=os.path.dirname(os.path.abspath(__file__)),
+                       shell=True)
+    return p.stdout.decode('utf-8').strip() if p.returncode == 0 else None
+
+def main():
+    parser = argparse.ArgumentParser(
+        prog = 'bench_orchestrator',
+        description='Benchmark the build_linux_mac orchestration without building gcc'
+    )
+
+    parser.add_argument('--scale', type=float, default=1.0, help="Scale file counts and output volumes, 1.0 is roughly a real gcc build")
+    parser.add_argument('--only', type=str, default='output,extract,pack,download', help="Comma separated benchmarks to run")
+    parser.add_argument('--output', type=str, help="Write the JSON results to this file instead of stdout")
+    parser.add_argument('--seed', type=int, default=9000)
+
+    args = vars(parser.parse_args())
+    only = args['only'].split(',')
+    scale = args['scale']
+    rng = random.Random(args['seed'])
+
+    results = {
+        'time': time.strftime('%Y-%m-%d %H:%M:%S'),
+        'commit': get_commit(),
+        'python': platform.python_version(),
+        'platform': f'{platform.machine()}-{platform.system()}'.lower(),
+        'cpus': os.cpu_count(),
+        'scale': scale,
+        'benchmarks': {}
+    }
+    benchmarks = results['benchmarks']
+
+    directory = tempfile.mkdtemp(prefix='bench_orchestrator_')
+    try:
+        write_stand_ins(directory)
+
+        if 'output' in only:
+            print('Benchmarking get_subprocess_output...', file=sys.stderr)
+            benchmarks['configure_output'] = bench_subprocess_output(directory, 'configure', int(20000 * scale), 0, 60)
+            benchmarks['gmake_output'] = bench_subprocess_output(directory, 'gmake', int(100000 * scale), 0, 400)
+            benchmarks['gmake_output_throttled'] = bench_subprocess_output(directory, 'gmake', int(20000 * scale), 10000, 400)
+
+        if 'extract' in only:
+            print('Benchmarking extract_sources...', file=sys.stderr)
+            benchmarks['extract_sources'] = bench_extract(directory, scale, rng)
+
+        if 'pack' in only:
+            print('Benchmarking pack_compiler...', file=sys.stderr)
+            benchmarks['pack_compiler'] = bench_pack(directory, scale, rng)
+
+        if 'download' in only:
+            print('Benchmarking download_sources...', file=sys.stderr)
+            benchmarks['download_sources'] = bench_download(directory, scale, rng)
+    finally:
+        shutil.rmtree(directory, ignore_errors=True)
+
+    output = json.dumps(results, indent=4)
+    if args['output']:
+        f = open(args['output'], 'w')
+        f.write(output)
+        f.close()
+    else:
+        print(output)
+
+if __name__ == "__main__":
+    main()
@@ -3,7 +3,7 @@ import sys
 import argparse
 import time
 import urllib.request
-from tarfile import TarFile
+from tarfile import TarFile, TarError
 import warnings
 import glob
 import subprocess
@@ -11,6 +11,10 @@ import shutil
 import json
 import platform
 import lzma
+import hashlib
+import tempfile
+from concurrent.futures import ThreadPoolExecutor, wait, FIRST_COMPLETED
+from functools import partial
 
 def reporthook(count, block_size, total_size):
     global start_time
@@ -19,30 +23,33 @@ def reporthook(count, block_size, total_size):
         return
     duration = time.time() - start_time
     progress_size = int(count * block_size)
-    speed = int(progress_size / (1024 * duration))
+    speed = int(progress_size / (1024 * max(duration, 0.001)))
     percent = int(count * block_size * 100 / total_size)
     sys.stdout.write('\r   %d%%, %d MB, %d KB/s, %d seconds passed' %
                     (percent, progress_size / (1024 * 1024), speed, duration))
     sys.stdout.flush()
 
-def download_sources(binutils_version, gdb_version, gcc_version, mingw_version, mtools_version):
-    binutils_link = 'https://ftp.gnu.org/gnu/binutils'
+def download_sources(binutils_version, gdb_version, gcc_version, mingw_version, mtools_version, gnu_mirror=None, mingw_mirror=None):
+    gnu_mirror = gnu_mirror or 'https://ftp.gnu.org/gnu'
+    mingw_mirror = mingw_mirror or 'https://downloads.sourceforge.net/project/mingw-w64/mingw-w64/mingw-w64-release'
+
+    binutils_link = f'{gnu_mirror}/binutils'
     binutils = f'binutils-{binutils_version}'
     binutils_filename = f'{binutils}.tar.gz'
     
-    gdb_link = 'https://ftp.gnu.org/gnu/gdb'
+    gdb_link = f'{gnu_mirror}/gdb'
     gdb = f'gdb-{gdb_version}'
     gdb_filename = f'{gdb}.tar.gz'
 
-    gcc_link = 'https://ftp.gnu.org/gnu/gcc'
+    gcc_link = f'{gnu_mirror}/gcc'
     gcc = f'gcc-{gcc_version}'
     gcc_filename = f'{gcc}.tar.gz'
 
-    mingw_link = 'https://downloads.sourceforge.net/project/mingw-w64/mingw-w64/mingw-w64-release'
+    mingw_link = mingw_mirror
     mingw = f'mingw-w64-v{mingw_version}'
     mingw_filename = f'{mingw}.tar.bz2'
 
-    mtools_link = 'https://ftp.gnu.org/gnu/mtools'
+    mtools_link = f'{gnu_mirror}/mtools'
     mtools = f'mtools-{mtools_version}'
     mtools_filename = f'{mtools}.tar.gz' 
 
@@ -73,552 +80,391 @@ def extract_sources():
         tar_file = TarFile.open(f'tarballs/{filename}', 'r')
         tar_file.extractall('sources')
 
-def get_build_env(prefix, mingw_gcc, elf_gcc, target):
+def get_build_env(prefix, target, path_prefixes, profile=None, pgo_flags=''):
     env = os.environ.copy()
     env['PREFIX'] = prefix
     env['TARGET'] = target
-    if elf_gcc:
-        env['PATH'] = f'{os.path.abspath(elf_gcc)}/bin:{env['PATH']}' 
-    if mingw_gcc:
-        env['PATH'] = f'{os.path.abspath(mingw_gcc)}/bin:{env['PATH']}' 
+    for path_prefix in reversed(path_prefixes):
+        env['PATH'] = f'{os.path.abspath(path_prefix)}/bin:{env['PATH']}' 
     env['PATH'] = f'{os.path.abspath(prefix)}/bin:{env['PATH']}' 
+    if profile or pgo_flags:
+        set_profile_flags(env, profile or {}, pgo_flags)
     return env
 
-def get_subprocess_output(pipe):
+def set_profile_flags(env, profile, pgo_flags=''):
+    for name in ['CFLAGS', 'CXXFLAGS', 'LDFLAGS']:
+        # Setting the variable replaces gcc's default -g -O2, keep optimizing when only pgo flags are added
+        base = '-O2' if pgo_flags and name != 'LDFLAGS' else ''
+        flags = ' '.join(f for f in [profile.get(name.lower(), base), pgo_flags] if f)
+        if flags:
+            env[name] = flags
+    # gcc derives the target library flags from CFLAGS, keep them host independent
+    env['CFLAGS_FOR_TARGET'] = '-g -O2'
+    env['CXXFLAGS_FOR_TARGET'] = '-g -O2'
+    env['LDFLAGS_FOR_TARGET'] = ''
+
+def get_pgo_dir(name):
+    return os.path.abspath(f'build/{name}/pgo-gcc')
+
+def get_pgo_flags(name, phase):
+    pgo_dir = get_pgo_dir(name)
+    if phase == 'generate':
+        return f'-fprofile-generate={pgo_dir}'
+    return f'-fprofile-use={pgo_dir} -fprofile-partial-training -Wno-missing-profile -Wno-coverage-mismatch'
+
+def get_subprocess_output(pipe, log=None):
     while pipe.poll() is None:
         l = pipe.stdout.readline()
-        print(l.decode('utf-8'), end='')
-    print(pipe.stdout.read().decode('utf-8'), end='')
-
-def build_mingw_toolchain(prefix):
-    target = 'x86_64-w64-mingw32'
-    env = get_build_env(prefix, '', '', target)
-
-    os.makedirs(f'build/build-binutils-{target}', exist_ok=True)
-    os.makedirs(f'build/build-gcc-{target}', exist_ok=True)
-    os.makedirs(f'build/build-mingw-headers-{target}', exist_ok=True)
-    os.makedirs(f'build/build-mingw-libs-{target}', exist_ok=True)
-    os.makedirs(f'build/build-mingw-winpthreads-{target}', exist_ok=True)
-
-    binutils = glob.glob('sources/*binutils*')[0]
-    gcc = glob.glob('sources/*gcc*')[0]
-    mingw = glob.glob('sources/*mingw*')[0]
-    
-    print('   Configuring binutils...')
-    p = subprocess.Popen(f'../../{binutils}/configure --target={target} --prefix={os.path.abspath(prefix)} --with-sysroot={os.path.abspath(prefix)} --disable-nls --disable-werror --without-zstd', 
-                         stdout=subprocess.PIPE, 
-                         env=env,
-                         cwd=f'build/build-binutils-{target}/',
-                         shell=True)
-    get_subprocess_output(p)
-    
-    print('   Building binutils...')
-    p = subprocess.Popen(f'gmake -j16', 
-                         stdout=subprocess.PIPE, 
-                         env=env,
-                         cwd=f'build/build-binutils-{target}/',
-                         shell=True)
-    get_subprocess_output(p)
-    
-    print('   Installing binutils...')
-    p = subprocess.Popen(f'gmake install-strip', 
-                         stdout=subprocess.PIPE, 
-                         env=env,
-                         cwd=f'build/build-binutils-{target}/',
-                         shell=True)
-    get_subprocess_output(p)
-   
-    print('  Configuring mingw headers...')
-    p = subprocess.Popen(f'../../{mingw}/mingw-w64-headers/configure --host={target} --prefix={os.path.abspath(prefix)}/{target}', 
-                         stdout=subprocess.PIPE, 
-                         env=env,
-                         cwd=f'build/build-mingw-headers-{target}/',
-                         shell=True)
-    get_subprocess_output(p)
-    
-    print('   Installing mingw headers...')
-    p = subprocess.Popen(f'gmake install', 
-                         stdout=subprocess.PIPE, 
-                         env=env,
-                         cwd=f'build/build-mingw-headers-{target}/',
-                         shell=True)
-    get_subprocess_output(p)
-
-    print('   Creating symlink...')
-    p = subprocess.Popen(f'ln -s {os.path.abspath(prefix)}/{target} {os.path.abspath(prefix)}/mingw', shell=True)
-
-    print('   Download prerequisites...')
-    p = subprocess.Popen(f'contrib/download_prerequisites', 
-                         stdout=subprocess.PIPE, 
-                         env=env,
-                         cwd = f'{gcc}',
-                         shell=True)
-    get_subprocess_output(p)
-
-    print('   Configuring gcc...')
-    p = subprocess.Popen(f'../../{gcc}/configure --target={target} --with-sysroot={os.path.abspath(prefix)} --with-ld={os.path.abspath(prefix)}/bin/{target}-ld --with-as={os.path.abspath(prefix)}/bin/{target}-as --prefix={os.path.abspath(prefix)} --without-zstd --disable-nls --disable-multilib --disable-werror --enable-languages=c,c++ --enable-threads=posix', 
-                         stdout=subprocess.PIPE, 
-                         env=env,
-                         cwd=f'build/build-gcc-{target}/',
-                         shell=True)
-    get_subprocess_output(p)
-
-    print('   Building gcc...')
-    p = subprocess.Popen(f'gmake all-gcc -j16', 
-                         stdout=subprocess.PIPE, 
-                         env=env,
-                         cwd=f'build/build-gcc-{target}/',
-                         shell=True)
-    get_subprocess_output(p)
-
-    print('   Installing gcc...')
-    p = subprocess.Popen(f'gmake install-strip-gcc', 
-                         stdout=subprocess.PIPE, 
-                         env=env,
-                         cwd=f'build/build-gcc-{target}/',
-                         shell=True)
-    get_subprocess_output(p)
-
-    env_copy = env.copy()
-    env_copy['CC'] = f'{target}-gcc'
-    env_copy['CXX'] = f'{target}-g++'
-    env_copy['CPP'] = f'{target}-cpp'
-
-    print('  Configuring mingw...')
-    p = subprocess.Popen(f'../../{mingw}/mingw-w64-crt/configure --host={target} --prefix={os.path.abspath(prefix)}/{target} --with-sysroot={os.path.abspath(prefix)}/{target} --disable-multilib', 
-                         stdout=subprocess.PIPE, 
-                         env=env_copy,
-                         cwd=f'build/build-mingw-libs-{target}/',
-                         shell=True)
-    get_subprocess_output(p)
-  
-    print('  Building mingw...')
-    p = subprocess.Popen(f'gmake -j16', 
-                         stdout=subprocess.PIPE, 
-                         env=env_copy,
-                         cwd=f'build/build-mingw-libs-{target}/',
-                         shell=True)
-    get_subprocess_output(p)
-  
-    print('  Installing mingw...')
-    p = subprocess.Popen(f'gmake install-strip', 
-                         stdout=subprocess.PIPE, 
-                         env=env_copy,
-                         cwd=f'build/build-mingw-libs-{target}/',
-                         shell=True)
-    get_subprocess_output(p)
-
-    print('  Configuring mingw winpthreads...')
-    p = subprocess.Popen(f'../../{mingw}/mingw-w64-libraries/winpthreads/configure --host={target} --with-sysroot={os.path.abspath(prefix)}/{target} --prefix={os.path.abspath(prefix)}/{target}', 
-                         stdout=subprocess.PIPE, 
-                         env=env_copy,
-                         cwd=f'build/build-mingw-winpthreads-{target}/',
-                         shell=True)
-    get_subprocess_output(p)
-  
-    print('  Building mingw winpthreads...')
-    p = subprocess.Popen(f'gmake -j16', 
-                         stdout=subprocess.PIPE, 
-                         env=env_copy,
-                         cwd=f'build/build-mingw-winpthreads-{target}/',
-                         shell=True)
-    get_subprocess_output(p)
-  
-    print('  Installing mingw winpthreads...')
-    p = subprocess.Popen(f'gmake install-strip', 
-                         stdout=subprocess.PIPE, 
-                         env=env_copy,
-                         cwd=f'build/build-mingw-winpthreads-{target}/',
-                         shell=True)
-    get_subprocess_output(p)
-    
-    print('  Building gcc libs...')   
-    p = subprocess.Popen(f'gmake -j16', 
-                         stdout=subprocess.PIPE, 
-                         env=env,
-                         cwd=f'build/build-gcc-{target}/',
-                         shell=True)
-    get_subprocess_output(p)
-
-    print('   Installing gcc libs...')
-    p = subprocess.Popen(f'gmake install-strip', 
-                         stdout=subprocess.PIPE, 
-                         env=env,
-                         cwd=f'build/build-gcc-{target}/',
-                         shell=True)
-    get_subprocess_output(p)
- 
+        if log:
+            log.write(l.decode('utf-8'))
+        else:
+            print(l.decode('utf-8'), end='')
+    if log:
+        log.write(pipe.stdout.read().decode('utf-8'))
+    else:
+        print(pipe.stdout.read().decode('utf-8'), end='')
+    return pipe.returncode
+
 def cleanup():
     shutil.rmtree('build', ignore_errors=True)
     shutil.rmtree('sources', ignore_errors=True)
     shutil.rmtree('tarballs', ignore_errors=True)
 
-def build_elf_toolchain(prefix):
-    target = 'x86_64-elf'
-    env = get_build_env(prefix, '', '', target)
-
-    os.makedirs(f'build/build-binutils-{target}', exist_ok=True)
-    os.makedirs(f'build/build-gdb-{target}', exist_ok=True)
-    os.makedirs(f'build/build-gcc-{target}', exist_ok=True)
-
-    binutils = glob.glob('sources/*binutils*')[0]
-    gdb = glob.glob('sources/*gdb*')[0]
-    gcc = glob.glob('sources/*gcc*')[0]
-    
-    print('   Configuring binutils...')
-    p = subprocess.Popen(f'../../{binutils}/configure --target={target} --prefix={os.path.abspath(prefix)} --disable-nls --disable-werror --without-zstd', 
-                         stdout=subprocess.PIPE, 
-                         env=env,
-                         cwd=f'build/build-binutils-{target}/',
-                         shell=True)
-    get_subprocess_output(p)
-    
-    print('   Building binutils...')
-    p = subprocess.Popen(f'gmake -j16', 
-                         stdout=subprocess.PIPE, 
-                         env=env,
-                         cwd=f'build/build-binutils-{target}/',
-                         shell=True)
-    get_subprocess_output(p)
-    
-    print('   Installing binutils...')
-    p = subprocess.Popen(f'gmake install-strip', 
-                         stdout=subprocess.PIPE, 
-                         env=env,
-                         cwd=f'build/build-binutils-{target}/',
-                         shell=True)
-    get_subprocess_output(p)
-
-    print('   Download prerequisites...')
-    p = subprocess.Popen(f'contrib/download_prerequisites', 
-                         stdout=subprocess.PIPE, 
-                         env=env,
-                         cwd = f'{gcc}',
-                         shell=True)
-    get_subprocess_output(p)
-  
-    print('   Configuring gcc...')
-    p = subprocess.Popen(f'../../{gcc}/configure --target={target} --prefix={os.path.abspath(prefix)} --disable-nls --disable-multilib --disable-werror --disable-libstdcxx --without-zstd --without-headers --without-newlib --enable-languages=c,c++', 
-                         stdout=subprocess.PIPE, 
-                         env=env,
-                         cwd=f'build/build-gcc-{target}/',
-                         shell=True)
-    get_subprocess_output(p)
-
-    print('   Building gcc...')
-    p = subprocess.Popen(f'gmake all-gcc -j16', 
-                         stdout=subprocess.PIPE, 
-                         env=env,
-                         cwd=f'build/build-gcc-{target}/',
-                         shell=True)
-    get_subprocess_output(p)
-
-    print('   Installing gcc...')
-    p = subprocess.Popen(f'gmake install-strip-gcc', 
-                         stdout=subprocess.PIPE, 
-                         env=env,
-                         cwd=f'build/build-gcc-{target}/',
-                         shell=True)
-    get_subprocess_output(p)
-    
-    print('  Building gcc libs...')   
-    p = subprocess.Popen(f'gmake all-target-libgcc CFLAGS_FOR_TARGET=\'-g -O2 -mno-red-zone\' -j16', 
-                         stdout=subprocess.PIPE, 
-                         env=env,
-                         cwd=f'build/build-gcc-{target}/',
-                         shell=True)
-    get_subprocess_output(p)
-
-    print('   Installing gcc libs...')
-    p = subprocess.Popen(f'gmake install-target-libgcc', 
-                         stdout=subprocess.PIPE, 
-                         env=env,
-                         cwd=f'build/build-gcc-{target}/',
-                         shell=True)
-    get_subprocess_output(p)
-    
-    print('   Installing gmp...')
-    p = subprocess.Popen(f'gmake install-strip', 
-                         stdout=subprocess.PIPE, 
-                         env=env,
-                         cwd=f'build/build-gcc-{target}/gmp',
-                         shell=True)
-    get_subprocess_output(p)
-    
-    print('   Installing mpfr...')
-    p = subprocess.Popen(f'gmake install-strip', 
-                         stdout=subprocess.PIPE, 
-                         env=env,
-                         cwd=f'build/build-gcc-{target}/mpfr',
-                         shell=True)
-    get_subprocess_output(p)
-
-    print('   Installing mpc...')
-    p = subprocess.Popen(f'gmake install-strip', 
-                         stdout=subprocess.PIPE, 
-                         env=env,
-                         cwd=f'build/build-gcc-{target}/mpc',
-                         shell=True)
-    get_subprocess_output(p)
-
-    print('   Configuring gdb...')
-    p = subprocess.Popen(f'../../{gdb}/configure --target={target} --prefix={os.path.abspath(prefix)} --with-gmp={os.path.abspath(prefix)} --with-mpfr={os.path.abspath(prefix)} --without-zstd --disable-nls --disable-werror', 
-                         stdout=subprocess.PIPE, 
-                         env=env,
-                         cwd=f'build/build-gdb-{target}/',
-                         shell=True)
-    get_subprocess_output(p)
-
-    print('   Building gdb...')
-    p = subprocess.Popen(f'gmake all-gdb -j16', 
-                         stdout=subprocess.PIPE, 
-                         env=env,
-                         cwd=f'build/build-gdb-{target}/',
-                         shell=True)
-    get_subprocess_output(p)
-
-    print('   Installing gdb...')
-    p = subprocess.Popen(f'gmake install-gdb', 
-                         stdout=subprocess.PIPE, 
-                         env=env,
-                         cwd=f'build/build-gdb-{target}/',
-                         shell=True)
-    get_subprocess_output(p)
-
-def build_win_mingw(prefix, mingw_prefix):
-    target = 'x86_64-w64-mingw32'
-    env = get_build_env(prefix, mingw_prefix, '', target)
-
-    os.makedirs(f'build/build-win-binutils-{target}', exist_ok=True)
-    os.makedirs(f'build/build-win-gcc-{target}', exist_ok=True)
-    os.makedirs(f'build/build-win-mingw-headers-{target}', exist_ok=True)
-    os.makedirs(f'build/build-win-mingw-libs-{target}', exist_ok=True)
-    os.makedirs(f'build/build-win-mingw-winpthreads-{target}', exist_ok=True)
-
-    binutils = glob.glob('sources/*binutils*')[0]
-    gcc = glob.glob('sources/*gcc*')[0]
-    mingw = glob.glob('sources/*mingw*')[0]
-    
-    print('   Configuring binutils...')
-    p = subprocess.Popen(f'../../{binutils}/configure --host={target} --target={target} --prefix={os.path.abspath(prefix)} --disable-multilib --disable-nls --disable-werror --without-zstd', 
-                         stdout=subprocess.PIPE, 
-                         env=env,
-                         cwd=f'build/build-win-binutils-{target}/',
-                         shell=True)
-    get_subprocess_output(p)
-    
-    print('   Building binutils...')
-    p = subprocess.Popen(f'gmake -j16', 
-                         stdout=subprocess.PIPE, 
-                         env=env,
-                         cwd=f'build/build-win-binutils-{target}/',
-                         shell=True)
-    get_subprocess_output(p)
-    
-    print('   Installing binutils...')
-    p = subprocess.Popen(f'gmake install-strip', 
-                         stdout=subprocess.PIPE, 
-                         env=env,
-                         cwd=f'build/build-win-binutils-{target}/',
-                         shell=True)
-    get_subprocess_output(p)
-
-    print('   Download prerequisites...')
-    p = subprocess.Popen(f'contrib/download_prerequisites', 
-                         stdout=subprocess.PIPE, 
-                         env=env,
-                         cwd = f'{gcc}',
-                         shell=True)
-    get_subprocess_output(p)
-
-    print('   Configuring gcc...')
-    p = subprocess.Popen(f'../../{gcc}/configure --host={target} --target={target} --prefix={os.path.abspath(prefix)} --disable-nls --disable-multilib --disable-werror --enable-languages=c,c++', 
-                         stdout=subprocess.PIPE, 
-                         env=env,
-                         cwd=f'build/build-win-gcc-{target}/',
-                         shell=True)
-    get_subprocess_output(p)
-
-    print('   Building gcc...')
-    p = subprocess.Popen(f'gmake -j16', 
-                         stdout=subprocess.PIPE, 
-                         env=env,
-                         cwd=f'build/build-win-gcc-{target}/',
-                         shell=True)
-    get_subprocess_output(p)
-
-    print('   Installing gcc...')
-    p = subprocess.Popen(f'gmake install-strip', 
-                         stdout=subprocess.PIPE, 
-                         env=env,
-                         cwd=f'build/build-win-gcc-{target}/',
-                         shell=True)
-    get_subprocess_output(p)
-
-    print('  Configuring mingw...')
-    p = subprocess.Popen(f'../../{mingw}/configure --host={target} --prefix={os.path.abspath(prefix)}/{target} --with-libraries=winpthreads --disable-multilib', 
-                         stdout=subprocess.PIPE, 
-                         env=env,
-                         cwd=f'build/build-win-mingw-libs-{target}/',
-                         shell=True)
-    get_subprocess_output(p)
-  
-    print('  Building mingw...')
-    p = subprocess.Popen(f'gmake -j16', 
-                         stdout=subprocess.PIPE, 
-                         env=env,
-                         cwd=f'build/build-win-mingw-libs-{target}/',
-                         shell=True)
-    get_subprocess_output(p)
-  
-    print('  Installing mingw...')
-    p = subprocess.Popen(f'gmake install-strip', 
-                         stdout=subprocess.PIPE, 
-                         env=env,
-                         cwd=f'build/build-win-mingw-libs-{target}/',
-                         shell=True)
-    get_subprocess_output(p)
-
-    print('  Copying libgcc to bin...')
-    p = subprocess.Popen(f'cp {os.path.abspath(prefix)}/lib/libgcc_s_seh-1.dll {os.path.abspath(prefix)}/bin/', shell=True)
-    p.wait()
-
-    print('  Copying libwinpthread to bin...')
-    p = subprocess.Popen(f'cp {os.path.abspath(prefix)}/{target}/bin/libwinpthread-1.dll {os.path.abspath(prefix)}/bin/', shell=True)
-    p.wait()
-
-    print('   Installing gmp...')
-    p = subprocess.Popen(f'gmake install-strip', 
-                         stdout=subprocess.PIPE, 
-                         env=env,
-                         cwd=f'build/build-win-gcc-{target}/gmp',
-                         shell=True)
-    get_subprocess_output(p)
-    
-    print('   Installing mpfr...')
-    p = subprocess.Popen(f'gmake install-strip', 
-                         stdout=subprocess.PIPE, 
-                         env=env,
-                         cwd=f'build/build-win-gcc-{target}/mpfr',
-                         shell=True)
-    get_subprocess_output(p)
-
-    print('   Installing mpc...')
-    p = subprocess.Popen(f'gmake install-strip', 
-                         stdout=subprocess.PIPE, 
-                         env=env,
-                         cwd=f'build/build-win-gcc-{target}/mpc',
-                         shell=True)
-    get_subprocess_output(p)
-
-def build_win_elf(prefix, mingw_prefix, elf_prefix, win_mingw_prefix):
-    host = 'x86_64-w64-mingw32'
-    target = 'x86_64-elf'
-    env = get_build_env(prefix, mingw_prefix, elf_prefix, target)
-
-    os.makedirs(f'build/build-win-elf-binutils-{target}', exist_ok=True)
-    os.makedirs(f'build/build-win-elf-gdb-{target}', exist_ok=True)
-    os.makedirs(f'build/build-win-elf-gcc-{target}', exist_ok=True)
-
-    binutils = glob.glob('sources/*binutils*')[0]
-    gdb = glob.glob('sources/*gdb*')[0]
-    gcc = glob.glob('sources/*gcc*')[0]
-    
-    print('   Configuring binutils...')
-    p = subprocess.Popen(f'../../{binutils}/configure --host={host} --target={target} --prefix={os.path.abspath(prefix)} --disable-nls --disable-werror --without-zstd', 
-                         stdout=subprocess.PIPE, 
-                         env=env,
-                         cwd=f'build/build-win-elf-binutils-{target}/',
-                         shell=True)
-    get_subprocess_output(p)
-    
-    print('   Building binutils...')
-    p = subprocess.Popen(f'gmake -j16', 
-                         stdout=subprocess.PIPE, 
-                         env=env,
-                         cwd=f'build/build-win-elf-binutils-{target}/',
-                         shell=True)
-    get_subprocess_output(p)
-    
-    print('   Installing binutils...')
-    p = subprocess.Popen(f'gmake install-strip', 
-                         stdout=subprocess.PIPE, 
-                         env=env,
-                         cwd=f'build/build-win-elf-binutils-{target}/',
-                         shell=True)
-    get_subprocess_output(p)
-
-    print('   Download prerequisites...')
-    p = subprocess.Popen(f'contrib/download_prerequisites', 
-                         stdout=subprocess.PIPE, 
-                         env=env,
-                         cwd = f'{gcc}',
-                         shell=True)
-    get_subprocess_output(p)
-  
-    print('   Configuring gcc...')
-    p = subprocess.Popen(f'../../{gcc}/configure --host={host} --target={target} --prefix={os.path.abspath(prefix)} --disable-nls --disable-multilib --disable-werror --disable-libstdcxx --without-zstd --without-headers --without-newlib --enable-languages=c,c++', 
-                         stdout=subprocess.PIPE, 
-                         env=env,
-                         cwd=f'build/build-win-elf-gcc-{target}/',
-                         shell=True)
-    get_subprocess_output(p)
-
-    print('   Building gcc...')
-    p = subprocess.Popen(f'gmake all-gcc -j16', 
-                         stdout=subprocess.PIPE, 
-                         env=env,
-                         cwd=f'build/build-win-elf-gcc-{target}/',
-                         shell=True)
-    get_subprocess_output(p)
-
-    print('   Installing gcc...')
-    p = subprocess.Popen(f'gmake install-strip-gcc', 
-                         stdout=subprocess.PIPE, 
-                         env=env,
-                         cwd=f'build/build-win-elf-gcc-{target}/',
-                         shell=True)
-    get_subprocess_output(p)
-    
-    print('  Building gcc libs...')   
-    p = subprocess.Popen(f'gmake all-target-libgcc CFLAGS_FOR_TARGET=\'-g -O2 -mno-red-zone\' -j16', 
-                         stdout=subprocess.PIPE, 
-                         env=env,
-                         cwd=f'build/build-win-elf-gcc-{target}/',
-                         shell=True)
-    get_subprocess_output(p)
-
-    print('   Installing gcc libs...')
-    p = subprocess.Popen(f'gmake install-target-libgcc', 
-                         stdout=subprocess.PIPE, 
-                         env=env,
-                         cwd=f'build/build-win-elf-gcc-{target}/',
-                         shell=True)
-    get_subprocess_output(p)
-    
-    print('   Configuring gdb...')
-    p = subprocess.Popen(f'../../{gdb}/configure --host={host} --target={target} --enable-targets={target},i386-elf --prefix={os.path.abspath(prefix)} --with-gmp={os.path.abspath(win_mingw_prefix)} --with-mpfr={os.path.abspath(win_mingw_prefix)} --without-zstd --disable-nls --disable-werror', 
-                         stdout=subprocess.PIPE, 
-                         env=env,
-                         cwd=f'build/build-win-elf-gdb-{target}/',
-                         shell=True)
-    get_subprocess_output(p)
-
-    print('   Building gdb...')
-    p = subprocess.Popen(f'gmake all-gdb -j16', 
-                         stdout=subprocess.PIPE, 
-                         env=env,
-                         cwd=f'build/build-win-elf-gdb-{target}/',
-                         shell=True)
-    get_subprocess_output(p)
-
-    print('   Installing gdb...')
-    p = subprocess.Popen(f'gmake install-gdb', 
-                         stdout=subprocess.PIPE, 
-                         env=env,
-                         cwd=f'build/build-win-elf-gdb-{target}/',
-                         shell=True)
-    get_subprocess_output(p)
+def get_triplet_format(triplet):
+    if 'mingw' in triplet or 'cygwin' in triplet:
+        return 'pe'
+    if 'darwin' in triplet:
+        return 'macho'
+    return 'elf'
+
+def get_strip_tools(host, target):
+    tools = {}
+    if target:
+        tools[get_triplet_format(target)] = f'{target}-strip'
+    # Host binaries win when host and target share the object format, the host strip knows them
+    if host:
+        tools[get_triplet_format(host)] = f'{host}-strip'
+    else:
+        tools['macho' if platform.system() == 'Darwin' else 'elf'] = 'strip'
+    return tools
+
+def link_file(source, path):
+    # Renaming over a hardlink of the same inode is a no-op and would leave the temporary behind
+    if os.stat(source).st_ino == os.stat(path).st_ino:
+        return False
+    os.link(source, f'{path}.tmp')
+    os.replace(f'{path}.tmp', path)
+    return True
+
+def strip_binaries(prefix, strip_tools, env):
+    binaries = {}
+    for root, _, filenames in os.walk(prefix):
+        for filename in filenames:
+            path = os.path.join(root, filename)
+            if os.path.islink(path) or not os.path.isfile(path):
+                continue
+            binfmt, library = get_binary_info(path)
+            if binfmt not in strip_tools:
+                continue
+            # Hardlinked copies are stripped once and relinked afterwards
+            binaries.setdefault(os.stat(path).st_ino, []).append((path, binfmt, library))
+
+    def strip(paths):
+        path, binfmt, library = paths[0]
+        if binfmt == 'macho':
+            flags = '-x' if library else ''
+        else:
+            flags = '--strip-unneeded'
+        size = os.path.getsize(path)
+        p = subprocess.run(f'{strip_tools[binfmt]} {flags} "{path}"',
+                           stdout=subprocess.PIPE,
+                           stderr=subprocess.STDOUT,
+                           env=env,
+                           shell=True)
+        if p.returncode != 0:
+            return path, 0, p.stdout.decode('utf-8')
+        for other, _, _ in paths[1:]:
+            link_file(path, other)
+        return path, size - os.path.getsize(path), None
+
+    with ThreadPoolExecutor(os.cpu_count()) as executor:
+        results = list(executor.map(strip, binaries.values()))
+    failed = [(path, error) for path, _, error in results if error is not None]
+    for path, error in failed:
+        print(f'   Could not strip {path}: {error.strip()}')
+    return len(results) - len(failed), sum(saved for _, saved, _ in results), len(failed)
+
+def get_file_hash(path):
+    digest = hashlib.sha256()
+    f = open(path, 'rb')
+    for block in iter(lambda: f.read(1024 * 1024), b''):
+        digest.update(block)
+    f.close()
+    return digest.hexdigest()
+
+def dedup_files(prefix):
+    # Hardlinks share their mode and owner, only files agreeing on them can be merged
+    kinds = {}
+    for root, _, filenames in os.walk(prefix):
+        for filename in sorted(filenames):
+            path = os.path.join(root, filename)
+            if os.path.islink(path) or not os.path.isfile(path):
+                continue
+            stat = os.stat(path)
+            if stat.st_size > 0:
+                kind = (stat.st_size, stat.st_mode, stat.st_uid, stat.st_gid)
+                kinds.setdefault(kind, []).append((path, stat.st_ino))
+
+    candidates = {path: kind for kind, files in kinds.items() if len({ino for _, ino in files}) > 1 for path, _ in files}
+    with ThreadPoolExecutor(os.cpu_count()) as executor:
+        hashes = dict(zip(candidates, executor.map(get_file_hash, candidates)))
+
+    groups = {}
+    for path in sorted(candidates):
+        groups.setdefault((candidates[path], hashes[path]), []).append(path)
+
+    linked = 0
+    saved = 0
+    for paths in groups.values():
+        original = os.stat(paths[0])
+        for path in paths[1:]:
+            if link_file(paths[0], path):
+                linked += 1
+                saved += original.st_size
+    return linked, saved
+
+def post_install(prefix, strip_tools, env, dedup=True):
+    start = time.time()
+    stripped, strip_saved, strip_failed = strip_binaries(prefix, strip_tools, env)
+    linked, dedup_saved = dedup_files(prefix) if dedup else (0, 0)
+    print('   Stripped %d binaries (%.1f MB), %d failed, hardlinked %d duplicates (%.1f MB) in %.1f s' %
+          (stripped, strip_saved / (1024 * 1024), strip_failed, linked, dedup_saved / (1024 * 1024), time.time() - start))
+    # An unstripped prefix must not be packed as if the step had worked
+    return strip_failed == 0
+
+def write_build_profile(prefix, profile_name):
+    f = open(os.path.join(prefix, '.build_profile'), 'w')
+    f.write(f'{profile_name}\n')
+    f.close()
+    return True
+
+def get_build_profile(prefix):
+    # Prefixes built before the profile was recorded were built with the default flags
+    path = os.path.join(prefix, '.build_profile')
+    if not os.path.isfile(path):
+        return 'default'
+    f = open(path)
+    profile_name = f.read().strip()
+    f.close()
+    return profile_name
+
+def check_build_profile(descriptor, profile_name):
+    # Archives and benchmarks are labelled with the profile, it has to be the one the prefix was built with
+    expected = 'default' if descriptor.get('host') else profile_name
+    built = get_build_profile(descriptor['prefix'])
+    if built != expected:
+        print(f'{descriptor["prefix"]} was built with the {built} profile, not {expected}, run with --profile {built}')
+        return False
+    return True
+
+def get_targets(config):
+    return {descriptor['name']: descriptor for descriptor in config.get('targets', [])}
+
+def get_sources():
+    sources = {}
+    for name in ['binutils', 'gdb', 'gcc', 'mingw']:
+        matches = glob.glob(f'sources/*{name}*')
+        if matches:
+            sources[name] = os.path.abspath(matches[0])
+    return sources
+
+def get_build_steps(descriptor, targets, sources, profile, profile_name, corpus, jobs):
+    name = descriptor['name']
+    target = descriptor['target']
+    host = descriptor.get('host')
+    prefix = os.path.abspath(descriptor['prefix'])
+    requires = [targets[r]['prefix'] for r in descriptor.get('requires', [])]
+    prefixes = {n: os.path.abspath(t['prefix']) for n, t in targets.items()}
+    flags = {k: v.format(prefix=prefix, target=target, host=host, prefixes=prefixes) for k, v in descriptor.get('configure', {}).items()}
+    host_flag = f'--host={host} ' if host else ''
+    build = f'build/{name}'
+
+    # Host profiles only apply to compilers running on this machine
+    native_profile = profile if host is None else {}
+    env = get_build_env(descriptor['prefix'], target, requires, native_profile)
+    plain_env = get_build_env(descriptor['prefix'], target, requires)
+    target_env = get_build_env(descriptor['prefix'], target, requires)
+    target_env['CC'] = f'{target}-gcc'
+    target_env['CXX'] = f'{target}-g++'
+    target_env['CPP'] = f'{target}-cpp'
+    gcc_env = env
+
+    steps = []
+    def add(message, command, directory, step_env):
+        steps.append((message, command, f'{build}/{directory}', step_env))
+
+    for component in descriptor['components']:
+        if component == 'binutils':
+            add('Configuring binutils...', f'{sources["binutils"]}/configure {host_flag}--target={target} --prefix={prefix} {flags.get("binutils", "")}', 'binutils', env)
+            add('Building binutils...', f'gmake -j{jobs}', 'binutils', env)
+            add('Installing binutils...', f'gmake install', 'binutils', env)
+        elif component == 'mingw-headers':
+            add('Configuring mingw headers...', f'{sources["mingw"]}/mingw-w64-headers/configure --host={target} --prefix={prefix}/{target} {flags.get("mingw-headers", "")}', 'mingw-headers', plain_env)
+            add('Installing mingw headers...', f'gmake install', 'mingw-headers', plain_env)
+            add('Creating symlink...', f'ln -sfn {prefix}/{target} {prefix}/mingw', 'mingw-headers', plain_env)
+        elif component == 'gcc':
+            gcc_configure = f'{sources["gcc"]}/configure {host_flag}--target={target} --prefix={prefix} {flags.get("gcc", "")}'
+            if native_profile.get('pgo'):
+                pgo_env = get_build_env(descriptor['prefix'], target, requires, native_profile, get_pgo_flags(name, 'generate'))
+                # Counts of a previous build would be merged into the new ones and hidden by -Wno-coverage-mismatch
+                add('Removing old profiles...', f'rm -rf {get_pgo_dir(name)}', 'gcc', pgo_env)
+                add('Configuring instrumented gcc...', gcc_configure, 'gcc', pgo_env)
+                add('Building instrumented gcc...', f'gmake all-gcc -j{jobs}', 'gcc', pgo_env)
+                add('Installing instrumented gcc...', f'gmake install-gcc', 'gcc', pgo_env)
+                add('Training gcc...', partial(train_gcc_profile, descriptor, corpus), 'gcc', pgo_env)
+                gcc_env = get_build_env(descriptor['prefix'], target, requires, native_profile, get_pgo_flags(name, 'use'))
+            add('Configuring gcc...', gcc_configure, 'gcc', gcc_env)
+            add('Building gcc...', f'gmake all-gcc -j{jobs}', 'gcc', gcc_env)
+            add('Installing gcc...', f'gmake install-gcc', 'gcc', gcc_env)
+        elif component == 'libgcc':
+            add('Building libgcc...', f'gmake all-target-libgcc CFLAGS_FOR_TARGET=\'{descriptor.get("libgcc_cflags", "-g -O2")}\' -j{jobs}', 'gcc', gcc_env)
+            add('Installing libgcc...', f'gmake install-target-libgcc', 'gcc', gcc_env)
+        elif component == 'gcc-all':
+            add('Building gcc libs...', f'gmake -j{jobs}', 'gcc', gcc_env)
+            add('Installing gcc libs...', f'gmake install', 'gcc', gcc_env)
+        elif component in ['gmp', 'mpfr', 'mpc']:
+            add(f'Installing {component}...', f'gmake install', f'gcc/{component}', gcc_env)
+        elif component == 'mingw-crt':
+            add('Configuring mingw...', f'{sources["mingw"]}/mingw-w64-crt/configure --host={target} --prefix={prefix}/{target} {flags.get("mingw-crt", "")}', 'mingw-crt', target_env)
+            add('Building mingw...', f'gmake -j{jobs}', 'mingw-crt', target_env)
+            add('Installing mingw...', f'gmake install', 'mingw-crt', target_env)
+        elif component == 'winpthreads':
+            add('Configuring mingw winpthreads...', f'{sources["mingw"]}/mingw-w64-libraries/winpthreads/configure --host={target} --prefix={prefix}/{target} {flags.get("winpthreads", "")}', 'winpthreads', target_env)
+            add('Building mingw winpthreads...', f'gmake -j{jobs}', 'winpthreads', target_env)
+            add('Installing mingw winpthreads...', f'gmake install', 'winpthreads', target_env)
+        elif component == 'mingw':
+            add('Configuring mingw...', f'{sources["mingw"]}/configure --host={target} --prefix={prefix}/{target} {flags.get("mingw", "")}', 'mingw', env)
+            add('Building mingw...', f'gmake -j{jobs}', 'mingw', env)
+            add('Installing mingw...', f'gmake install', 'mingw', env)
+        elif component == 'runtime-dlls':
+            for dll in descriptor.get('runtime_dlls', []):
+                dll = dll.format(target=target)
+                add(f'Copying {os.path.basename(dll)} to bin...', f'cp {prefix}/{dll} {prefix}/bin/', '', env)
+        elif component == 'gdb':
+            add('Configuring gdb...', f'{sources["gdb"]}/configure {host_flag}--target={target} --prefix={prefix} {flags.get("gdb", "")}', 'gdb', env)
+            add('Building gdb...', f'gmake all-gdb -j{jobs}', 'gdb', env)
+            add('Installing gdb...', f'gmake install-gdb', 'gdb', env)
+        else:
+            print(f'Unknown component {component} in target {name}')
+            return None
+
+    # Windows extractors handle hardlinks in tarballs poorly, keep the copies in toolchains running on Windows
+    dedup = descriptor.get('dedup', get_triplet_format(host or '') != 'pe')
+    add('Stripping and deduplicating...', partial(post_install, prefix, get_strip_tools(host, target), plain_env, dedup), '', plain_env)
+    add('Recording build profile...', partial(write_build_profile, prefix, profile_name if host is None else 'default'), '', plain_env)
+    return steps
+
+def run_build_steps(name, steps, log):
+    for message, command, cwd, env in steps:
+        print(f'   [{name}] {message}')
+        os.makedirs(cwd, exist_ok=True)
+        if callable(command):
+            returncode = 0 if command() else 1
+        else:
+            p = subprocess.Popen(command, 
+                                 stdout=subprocess.PIPE, 
+                                 stderr=subprocess.STDOUT if log else None,
+                                 env=env,
+                                 cwd=f'{cwd}/',
+                                 shell=True)
+            returncode = get_subprocess_output(p, log)
+        if returncode != 0:
+            print(f'   [{name}] {message[:-3]} failed' + (f', see {log.name}' if log else ''))
+            return False
+    return True
+
+def build_target(descriptor, targets, sources, profile, profile_name, corpus, jobs, concurrent):
+    name = descriptor['name']
+    steps = get_build_steps(descriptor, targets, sources, profile, profile_name, corpus, jobs)
+    if steps is None:
+        return False
+    os.makedirs(f'build/{name}', exist_ok=True)
+    # Concurrent builds would interleave their output, keep it in a log per target
+    log = open(f'build/{name}.log', 'w') if concurrent else None
+    try:
+        return run_build_steps(name, steps, log)
+    finally:
+        if log:
+            log.close()
+
+def get_target_levels(names, targets):
+    levels = {}
+    def level(name):
+        if name not in levels:
+            levels[name] = 0
+            requires = [r for r in targets[name].get('requires', []) if r in names]
+            levels[name] = 1 + max([level(r) for r in requires], default=-1)
+        return levels[name]
+    for name in names:
+        level(name)
+    return levels
+
+def build_targets(config, names, profile, profile_name, corpus, jobs):
+    targets = get_targets(config)
+    for name in names:
+        if name not in targets:
+            print(f'Unknown target {name}')
+            return False
+        for r in targets[name].get('requires', []):
+            if r not in targets:
+                print(f'Unknown target {r} required by {name}')
+                return False
+    sources = get_sources()
+
+    if any('gcc' in targets[name]['components'] for name in names):
+        print('   Download prerequisites...')
+        p = subprocess.Popen(f'contrib/download_prerequisites', 
+                             stdout=subprocess.PIPE, 
+                             cwd=sources['gcc'],
+                             shell=True)
+        if get_subprocess_output(p) != 0:
+            return False
+
+    # Targets only wait for the requirements built in this run, the others must already be installed
+    levels = get_target_levels(names, targets)
+    width = max(list(levels.values()).count(level) for level in levels.values())
+    target_jobs = max(1, jobs // width)
+    concurrent = len(names) > 1
+
+    pending = list(names)
+    running = {}
+    done = set()
+    failed = set()
+    with ThreadPoolExecutor(len(names)) as executor:
+        while pending or running:
+            for name in list(pending):
+                requires = [r for r in targets[name].get('requires', []) if r in names]
+                if any(r in failed for r in requires):
+                    print(f'   [{name}] Skipped, a required target failed')
+                    pending.remove(name)
+                    failed.add(name)
+                elif all(r in done for r in requires):
+                    running[executor.submit(build_target, targets[name], targets, sources, profile, profile_name, corpus, target_jobs, concurrent)] = name
+                    pending.remove(name)
+            # Skipping the dependents of a failed target can empty pending with nothing left running
+            if not running:
+                if pending:
+                    print(f'Circular requirements between {", ".join(pending)}')
+                    return False
+                break
+            finished, _ = wait(running, return_when=FIRST_COMPLETED)
+            for future in finished:
+                name = running.pop(future)
+                if future.result():
+                    done.add(name)
+                else:
+                    failed.add(name)
+    return not failed
 
 def build_mtools(prefix):
     os.makedirs(f'build/build-mtools', exist_ok=True)
@@ -633,16 +479,28 @@ def build_mtools(prefix):
     p = subprocess.run(f'../../{mtools}/configure --prefix={os.path.abspath(prefix)} --disable-floppyd',
                        cwd=f'build/build-mtools',
                        shell=True)
+    if p.returncode != 0:
+        print('   Configuring mtools failed')
+        return False
    
     print('   Building mtools...')
     p = subprocess.run(f'make -j16',
                        cwd=f'build/build-mtools',
                        shell=True)
+    if p.returncode != 0:
+        print('   Building mtools failed')
+        return False
  
     print('   Installing mtools...')
     p = subprocess.run(f'make install',
                        cwd=f'build/build-mtools',
                        shell=True)
+    if p.returncode != 0:
+        print('   Installing mtools failed')
+        return False
+
+    print('   Stripping mtools...')
+    return post_install(prefix, get_strip_tools(None, None), os.environ.copy())
 
 def build_win_mtools(prefix, mingw_prefix):
     host = 'x86_64-w64-mingw32'
@@ -661,27 +519,490 @@ def build_win_mtools(prefix, mingw_prefix):
                        cwd=f'build/build-win-mtools',
                        env=env,
                        shell=True)
+    if p.returncode != 0:
+        print('   Configuring mtools failed')
+        return False
    
     print('   Building mtools...')
     p = subprocess.run(f'gmake -j16',
                        cwd=f'build/build-win-mtools',
                        env=env,
                        shell=True)
+    if p.returncode != 0:
+        print('   Building mtools failed')
+        return False
  
     print('   Installing mtools...')
+    os.makedirs(f'{prefix}/bin', exist_ok=True)
     p = subprocess.run(f'cp *.exe {os.path.abspath(prefix)}/bin',
                        cwd=f'build/build-win-mtools',
                        env=env,
                        shell=True)
+    if p.returncode != 0:
+        print('   Installing mtools failed')
+        return False
+
+    print('   Stripping mtools...')
+    return post_install(prefix, get_strip_tools(host, None), env, False)
+
+
+
+def get_corpus_sources(corpus):
+    return sorted(glob.glob(f'{corpus}/*.c') + glob.glob(f'{corpus}/*.cpp'))
+
+def compile_corpus(prefix, target, corpus, output_dir, flags='-O2', workers=None):
+    os.makedirs(output_dir, exist_ok=True)
+    sources = get_corpus_sources(corpus)
+
+    def compile_source(source):
+        if source.endswith('.cpp'):
+            compiler = f'{target}-g++ -std=c++17 -fno-exceptions -fno-rtti -fno-threadsafe-statics'
+        else:
+            compiler = f'{target}-gcc'
+        obj = os.path.join(output_dir, f'{os.path.basename(source)}.o')
+        p = subprocess.run(f'{os.path.abspath(prefix)}/bin/{compiler} -ffreestanding -fno-stack-protector -fshort-wchar {flags} -c {source} -o {obj}',
+                           stdout=subprocess.PIPE,
+                           stderr=subprocess.STDOUT,
+                           shell=True)
+        return source, p.returncode, p.stdout.decode('utf-8')
+
+    start = time.time()
+    with ThreadPoolExecutor(workers or os.cpu_count()) as executor:
+        results = list(executor.map(compile_source, sources))
+    duration = time.time() - start
+
+    failed = [source for source, returncode, _ in results if returncode != 0]
+    for source, returncode, output in results:
+        if returncode != 0:
+            print(f'   Failed to compile {source}:')
+            print(output, end='')
+    return len(sources), duration, failed
+
+def train_gcc_profile(descriptor, corpus):
+    name = descriptor['name']
+    target = descriptor['target']
+    flags = descriptor.get('corpus_cflags', '')
+
+    failed = compile_corpus(descriptor['prefix'], target, corpus, f'build/{name}/corpus-train', f'-O2 {flags}')[2]
+    failed += compile_corpus(descriptor['prefix'], target, corpus, f'build/{name}/corpus-train', f'-O0 -g {flags}')[2]
+
+    # Configure tests are rebuilt from different sources, their profiles would only mismatch
+    for filename in glob.glob(f'build/{name}/pgo-gcc/*conftest*'):
+        os.remove(filename)
+
+    shutil.rmtree(f'build/{name}/gcc')
+    return not failed
+
+def get_versions(config):
+    return {k: config[k] for k in ['binutils', 'gdb', 'gcc', 'mingw', 'mtools']}
+
+def benchmark_compiler(prefix, target, corpus, flags='', rounds=3, repeat=5, workers=2, output_dir=None):
+    # With one thread per file a round only times the slowest file, a fixed worker count and several passes time the compiler
+    best = None
+    for _ in range(rounds):
+        duration = 0
+        for _ in range(repeat):
+            files, seconds, failed = compile_corpus(prefix, target, corpus, output_dir or f'build/corpus-{target}-bench', f'-O2 {flags}', workers)
+            if failed:
+                return None
+            duration += seconds
+        best = duration if best is None else min(best, duration)
+    return {
+        'files': files * repeat,
+        'workers': workers,
+        'seconds': best,
+        'files_per_second': files * repeat / best
+    }
+
+def record_profile_benchmark(bench_prefix, profile_name, target, result):
+    path = os.path.join(bench_prefix, 'profiles.json')
+    results = {}
+    if os.path.isfile(path):
+        f = open(path)
+        results = json.load(f)
+        f.close()
+    results.setdefault(target, {})[profile_name] = result
+    f = open(path, 'w')
+    json.dump(results, f, indent=4)
+    f.close()
+    return results
+
+def print_profile_benchmark(results):
+    for target, profiles in results.items():
+        print(f'   {target}:')
+        baseline = profiles.get('default')
+        for name, result in profiles.items():
+            gain = 'n/a'
+            # Profiles measured with different gcc versions are not comparable
+            if baseline and baseline.get('versions') == result.get('versions'):
+                gain = '%+.1f%%' % ((result['files_per_second'] / baseline['files_per_second'] - 1) * 100)
+            print('      %-10s %8.2f files/s %8.3f s  %s' % (name, result['files_per_second'], result['seconds'], gain))
+
+
+def get_binary_info(path):
+    f = open(path, 'rb')
+    header = f.read(64)
+    signature = b''
+    characteristics = 0
+    if header[:2] == b'MZ' and len(header) == 64:
+        f.seek(int.from_bytes(header[60:64], 'little'))
+        coff = f.read(24)
+        signature = coff[:4]
+        characteristics = int.from_bytes(coff[22:24], 'little')
+    f.close()
+    # Returns the object format and whether the file is a shared library rather than an executable
+    if header[:4] == b'\x7fELF' and len(header) >= 18:
+        e_type = int.from_bytes(header[16:18], 'little' if header[5] == 1 else 'big')
+        if e_type in [2, 3]:
+            return 'elf', e_type == 3
+        return 'elf-object', False
+    if signature == b'PE\0\0':
+        return 'pe', bool(characteristics & 0x2000)
+    if header[:4] in [b'\xcf\xfa\xed\xfe', b'\xce\xfa\xed\xfe'] and len(header) >= 16:
+        return 'macho', int.from_bytes(header[12:16], 'little') != 2
+    if header[:4] == b'\xca\xfe\xba\xbe':
+        return 'macho', True
+    return None, False
+
+def get_binary_format(path):
+    binfmt = get_binary_info(path)[0]
+    return 'elf' if binfmt == 'elf-object' else binfmt
+
+def verify_compiler(descriptor, corpus, output_dir):
+    prefix = descriptor['prefix']
+    target = descriptor['target']
+    image = descriptor['image']
+    binfmt = descriptor['binfmt']
+    result = {'ok': False}
+    start = time.time()
+
+    bench = benchmark_compiler(prefix, target, corpus, descriptor.get('corpus_cflags', ''), output_dir=output_dir)
+    if bench is None:
+        print(f'   {target} failed to compile the corpus')
+        return result
+    result.update(bench)
+
+    objects = ' '.join(os.path.join(output_dir, f'{os.path.basename(source)}.o') for source in get_corpus_sources(corpus))
+    link_start = time.time()
+    p = subprocess.run(f'{os.path.abspath(prefix)}/bin/{target}-gcc -nostdlib -ffreestanding {descriptor.get("link_flags", "")} {objects} -o {output_dir}/{image} -lgcc',
+                       stdout=subprocess.PIPE,
+                       stderr=subprocess.STDOUT,
+                       shell=True)
+    result['link_seconds'] = time.time() - link_start
+    if p.returncode != 0:
+        print(f'   {target} failed to link {image}:')
+        print(p.stdout.decode('utf-8'), end='')
+        return result
+    if get_binary_format(f'{output_dir}/{image}') != binfmt:
+        print(f'   {target} linked {image} is not a {binfmt} image')
+        return result
+
+    result['image'] = f'{output_dir}/{image}'
+    result['image_bytes'] = os.path.getsize(result['image'])
+    result['total_seconds'] = time.time() - start
+    result['ok'] = True
+    return result
+
+def verify_mtools(prefix, files):
+    result = {'ok': False}
+    mtools = f'{os.path.abspath(prefix)}/bin'
+    if not os.path.isfile(f'{mtools}/mformat'):
+        print(f'   {prefix} has no mtools')
+        result['error'] = 'not installed'
+        return result
+
+    image = 'build/verify-mtools/esp.img'
+    shutil.rmtree('build/verify-mtools', ignore_errors=True)
+    os.makedirs('build/verify-mtools')
 
-    
-def pack_compiler(archive_prefix, prefix, arch, platform, binfmt):
-    xz_file = lzma.LZMAFile(os.path.join(archive_prefix, f'{arch}-{platform}-{binfmt}-gcc.tar.xz'), 'w')
+    env = os.environ.copy()
+    env['MTOOLS_SKIP_CHECK'] = '1'
+    # Images of different targets share file names, each is copied under its own name
+    commands = [
+        f'{mtools}/mformat -C -i {image} -f 2880 -v HAL9000 ::',
+        f'{mtools}/mmd -i {image} ::/EFI ::/EFI/BOOT'
+    ]
+    commands += [f'{mtools}/mcopy -i {image} {path} ::/EFI/BOOT/{name}' for name, path in files.items()]
+    commands.append(f'{mtools}/mdir -i {image} -b ::/EFI/BOOT')
+
+    start = time.time()
+    for command in commands:
+        p = subprocess.run(command, stdout=subprocess.PIPE, stderr=subprocess.STDOUT, env=env, shell=True)
+        if p.returncode != 0:
+            print(f'   mtools failed: {command}')
+            print(p.stdout.decode('utf-8'), end='')
+            return result
+    listing = p.stdout.decode('utf-8').upper()
+    for name in files:
+        if name.upper() not in listing:
+            print(f'   mtools image is missing {name}')
+            return result
+
+    result['total_seconds'] = time.time() - start
+    result['image_bytes'] = os.path.getsize(image)
+    result['ok'] = True
+    return result
+
+def get_verifiable_targets(targets):
+    # Only compilers running on this machine with a test image can be verified
+    return [name for name, descriptor in targets.items() if not descriptor.get('host') and 'image' in descriptor]
+
+def get_test_images(images, corpus):
+    return images or {os.path.basename(source): source for source in get_corpus_sources(corpus)}
+
+def extract_archive(path, directory):
+    try:
+        tar_file = TarFile.open(path, 'r:xz')
+        tar_file.extractall(directory)
+        tar_file.close()
+    except (TarError, lzma.LZMAError, EOFError, OSError) as e:
+        print(f'   Could not extract {path}: {e}')
+        return False
+    return True
+
+def verify_archives(config, corpus, names):
+    results = {}
+    images = {}
+    targets = get_targets(config)
+    platform_name = f'{str(platform.machine()).lower()}-{str(platform.system()).lower()}'
+
+    for name in names:
+        descriptor = targets[name]
+        archives = glob.glob(os.path.join(config['archive_prefix'], f'{platform_name}-{descriptor["archive"]}-gcc*.tar.xz'))
+        for path in sorted(archives):
+            print(f'   Verifying {os.path.basename(path)}...')
+            with tempfile.TemporaryDirectory() as prefix:
+                result = {'ok': False}
+                if extract_archive(path, prefix):
+                    result = verify_compiler(dict(descriptor, prefix=prefix), corpus, f'build/corpus-{descriptor["target"]}-archive')
+            results[os.path.basename(path)] = result
+            if result['ok']:
+                images[f'{name}-{descriptor["image"]}'] = result['image']
+
+    path = os.path.join(config['archive_prefix'], f'{platform_name}-mtools.tar.xz')
+    if os.path.isfile(path):
+        print(f'   Verifying {os.path.basename(path)}...')
+        with tempfile.TemporaryDirectory() as prefix:
+            result = {'ok': False}
+            if extract_archive(path, prefix):
+                result = verify_mtools(prefix, get_test_images(images, corpus))
+        results[os.path.basename(path)] = result
+    return results
+
+def verify_toolchains(config, corpus, profile_name, names):
+    results = {}
+    images = {}
+    targets = get_targets(config)
+    for name in names:
+        descriptor = targets[name]
+        print(f'   Verifying {name} toolchain...')
+        if not os.path.isfile(f'{descriptor["prefix"]}/bin/{descriptor["target"]}-gcc'):
+            print(f'   {descriptor["prefix"]} has no {descriptor["target"]}-gcc')
+            results[name] = {'ok': False, 'error': 'not installed'}
+            continue
+        results[name] = verify_compiler(descriptor, corpus, f'build/corpus-{descriptor["target"]}-bench')
+        if results[name]['ok']:
+            images[f'{name}-{descriptor["image"]}'] = results[name]['image']
+
+    print('   Verifying mtools...')
+    results['mtools'] = verify_mtools(config['mtools_prefix'], get_test_images(images, corpus))
+
+    # The packed archives are what gets distributed, check them the same way
+    results.update(verify_archives(config, corpus, names))
+
+    return {
+        'time': time.strftime('%Y-%m-%d %H:%M:%S'),
+        'profile': profile_name,
+        'versions': get_versions(config),
+        'results': results
+    }
+
+def record_verification(bench_prefix, record):
+    path = os.path.join(bench_prefix, 'verify.json')
+    history = []
+    if os.path.isfile(path):
+        f = open(path)
+        history = json.load(f)
+        f.close()
+    previous = history[-1] if history else None
+    history.append(record)
+    f = open(path, 'w')
+    json.dump(history, f, indent=4)
+    f.close()
+    return previous
+
+def print_verification(record, previous):
+    for name, result in record['results'].items():
+        status = 'ok' if result['ok'] else 'FAILED'
+        line = f'   {name}: {status}'
+        if 'error' in result:
+            line += f' ({result["error"]})'
+        if 'files_per_second' in result:
+            line += ', %.2f files/s' % result['files_per_second']
+            last = previous['results'].get(name, {}) if previous else {}
+            if last.get('files_per_second'):
+                line += ' (%+.1f%% vs gcc %s)' % ((result['files_per_second'] / last['files_per_second'] - 1) * 100, previous['versions']['gcc'])
+        if 'total_seconds' in result:
+            line += ', %.3f s total' % result['total_seconds']
+        print(line)
+
+
+def get_image_manifest(source):
+    # Maps image paths to host files, directories map to None so that empty ones are created too
+    entries = {}
+    if os.path.isdir(source):
+        mapping = {'': source}
+    else:
+        try:
+            f = open(source)
+            mapping = json.load(f)
+            f.close()
+        except (OSError, ValueError) as e:
+            print(f'   Could not read the manifest {source}: {e}')
+            return None
+        if not isinstance(mapping, dict) or not all(isinstance(v, str) for v in mapping.values()):
+            print(f'   {source} must map image paths to host paths')
+            return None
+        mapping = {k: os.path.join(os.path.dirname(source), v) for k, v in mapping.items()}
+
+    for image_path, host_path in mapping.items():
+        image_path = image_path.strip('/')
+        if not os.path.exists(host_path):
+            print(f'   {host_path} does not exist')
+            return None
+        if not os.path.isdir(host_path):
+            entries[image_path] = host_path
+            continue
+        for root, dirnames, filenames in os.walk(host_path):
+            for dirname in [''] + dirnames:
+                relative = os.path.relpath(os.path.join(root, dirname), host_path).replace(os.sep, '/')
+                image_dir = '/'.join(p for p in [image_path, relative] if p and p != '.')
+                if image_dir:
+                    entries[image_dir] = None
+            for filename in filenames:
+                relative = os.path.relpath(os.path.join(root, filename), host_path).replace(os.sep, '/')
+                entries['/'.join(p for p in [image_path, relative] if p)] = os.path.join(root, filename)
+    return sorted(entries.items())
+
+def get_image_hash(manifest, size, label, mtools_prefix):
+    digest = hashlib.sha256()
+    digest.update(f'{size} {label} {os.path.abspath(mtools_prefix)}\n'.encode('utf-8'))
+    for image_path, host_path in manifest:
+        if host_path is None:
+            digest.update(f'{image_path}/\n'.encode('utf-8'))
+            continue
+        file_digest = hashlib.sha256()
+        f = open(host_path, 'rb')
+        for block in iter(lambda: f.read(1024 * 1024), b''):
+            file_digest.update(block)
+        f.close()
+        digest.update(f'{image_path} {file_digest.hexdigest()}\n'.encode('utf-8'))
+    return digest.hexdigest()
+
+def run_mtools(command, env):
+    try:
+        p = subprocess.run(command, stdout=subprocess.PIPE, stderr=subprocess.STDOUT, env=env)
+    except OSError as e:
+        print(f'   Could not run {command[0]}: {e}')
+        return False
+    if p.returncode != 0:
+        print(f'   {os.path.basename(command[0])} failed:')
+        print(p.stdout.decode('utf-8'), end='')
+        return False
+    return True
+
+def write_image(manifest, tmp_image, size, label, mtools, env, batch):
+    # 64 heads * 32 sectors * 512 bytes is one MB per cylinder
+    f = open(tmp_image, 'wb')
+    f.truncate(size * 1024 * 1024)
+    f.close()
+    print(f'   Formatting {size} MB image...')
+    if not run_mtools([f'{mtools}/mformat', '-i', tmp_image, '-t', str(size), '-h', '64', '-s', '32', '-v', label, '::'], env):
+        return False
+
+    files = [(image_path, host_path) for image_path, host_path in manifest if host_path is not None]
+    directories = set()
+    for image_path, host_path in manifest:
+        parts = image_path.split('/') if host_path is None else image_path.split('/')[:-1]
+        for i in range(1, len(parts) + 1):
+            directories.add('/'.join(parts[:i]))
+    directories = sorted(directories, key=lambda d: (d.count('/'), d))
+    print(f'   Creating {len(directories)} directories...')
+    for i in range(0, len(directories), batch):
+        if not run_mtools([f'{mtools}/mmd', '-i', tmp_image] + [f'::/{d}' for d in directories[i:i + batch]], env):
+            return False
+
+    # Files keeping their name are copied together per destination directory
+    groups = {}
+    renamed = []
+    for image_path, host_path in files:
+        directory, _, name = image_path.rpartition('/')
+        if name == os.path.basename(host_path):
+            groups.setdefault(directory, []).append(host_path)
+        else:
+            renamed.append((image_path, host_path))
+    print(f'   Copying {len(files)} files...')
+    for directory, group in groups.items():
+        for i in range(0, len(group), batch):
+            if not run_mtools([f'{mtools}/mcopy', '-b', '-i', tmp_image] + group[i:i + batch] + [f'::/{directory}'], env):
+                return False
+    for image_path, host_path in renamed:
+        if not run_mtools([f'{mtools}/mcopy', '-i', tmp_image, host_path, f'::/{image_path}'], env):
+            return False
+    return True
+
+def build_image(source, image, size, label, mtools_prefix, batch=256):
+    manifest = get_image_manifest(source)
+    if manifest is None:
+        return False
+    image_hash = get_image_hash(manifest, size, label, mtools_prefix)
+    hash_file = f'{image}.sha256'
+    if os.path.isfile(image) and os.path.isfile(hash_file):
+        f = open(hash_file)
+        previous = f.read().strip()
+        f.close()
+        if previous == image_hash:
+            print(f'   {image} is up to date')
+            return True
+
+    env = os.environ.copy()
+    env['MTOOLS_SKIP_CHECK'] = '1'
+    mtools = f'{os.path.abspath(mtools_prefix)}/bin'
+    if not os.path.isfile(f'{mtools}/mformat'):
+        print(f'   {mtools_prefix} has no mtools, run --build_mtools first')
+        return False
+    tmp_image = f'{image}.tmp'
+    os.makedirs(os.path.dirname(os.path.abspath(image)), exist_ok=True)
+
+    try:
+        if not write_image(manifest, tmp_image, size, label, mtools, env, batch):
+            return False
+        os.replace(tmp_image, image)
+    finally:
+        # A half written image must not be picked up later
+        if os.path.exists(tmp_image):
+            os.remove(tmp_image)
+    f = open(hash_file, 'w')
+    f.write(image_hash)
+    f.close()
+    return True
+
+def get_compiler_archive(arch, platform, binfmt, profile_name='default'):
+    # Compilers built with another profile (e.g. -march=native) must not pass for the portable default build
+    suffix = '' if profile_name == 'default' else f'-{profile_name}'
+    return f'{arch}-{platform}-{binfmt}-gcc{suffix}.tar.xz'
+
+def pack_compiler(archive_prefix, prefix, arch, platform, binfmt, profile_name='default'):
+    archive = os.path.join(archive_prefix, get_compiler_archive(arch, platform, binfmt, profile_name))
+    # Written next to the archive first, an interrupted pack must not look like a complete archive
+    xz_file = lzma.LZMAFile(f'{archive}.tmp', 'w')
     tar_file = TarFile.open(mode='w', fileobj=xz_file)
     for filename in os.listdir(prefix):
         path = os.path.join(prefix, filename)
         tar_file.add(os.path.join(prefix, filename), arcname=os.path.basename(path))
+    tar_file.close()
     xz_file.close()
+    os.replace(f'{archive}.tmp', archive)
 
 def pack_mtools(archive_prefix, prefix, arch, platform):
     xz_file = lzma.LZMAFile(os.path.join(archive_prefix, f'{arch}-{platform}-mtools.tar.xz'), 'w')
@@ -689,6 +1010,7 @@ def pack_mtools(archive_prefix, prefix, arch, platform):
     for filename in os.listdir(prefix):
         path = os.path.join(prefix, filename)
         tar_file.add(os.path.join(prefix, filename), arcname=os.path.basename(path))
+    tar_file.close()
     xz_file.close()
 
 def main():
@@ -705,6 +1027,7 @@ def main():
     parser.add_argument('--build_win_elf', action='store_true', default=False)
     parser.add_argument('--build_mtools', action='store_true', default=False)
     parser.add_argument('--build_win_mtools', action='store_true', default=False)
+    parser.add_argument('--build', type=str, help="Comma separated target names from the configuration, or all")
 
     parser.add_argument('--pack_mingw', action='store_true', default=False)
     parser.add_argument('--pack_elf', action='store_true', default=False)
@@ -712,8 +1035,19 @@ def main():
     parser.add_argument('--pack_win_elf', action='store_true', default=False)
     parser.add_argument('--pack_mtools', action='store_true', default=False)
     parser.add_argument('--pack_win_mtools', action='store_true', default=False)
+    parser.add_argument('--pack', type=str, help="Comma separated target names from the configuration, or all")
+
+    parser.add_argument('--bench_profile', action='store_true', default=False)
+    parser.add_argument('--verify', nargs='?', const='all', type=str, help="Smoke test the installed toolchains, mtools and packed archives, optionally only the given comma separated targets")
+
+    parser.add_argument('--make_image', type=str, help="Build a FAT image from a directory or a JSON manifest (image path -> host path)")
+    parser.add_argument('--image', type=str, default='esp.img', help="Output of --make_image")
+    parser.add_argument('--image_size', type=int, help="Size of the --make_image image in MB, overrides image_size from the configuration")
 
+    parser.add_argument('--download', action='store_true', default=False, help="Only download the source tarballs")
     parser.add_argument('--cleanup', action='store_true', default=False)
+    parser.add_argument('--profile', type=str, help="Build profile, overrides build_profile from the configuration")
+    parser.add_argument('--jobs', type=int, help="Total make jobs shared by the targets built together, overrides jobs from the configuration")
     parser.add_argument('-config', '--config', required=True, type=str, help="Configuration JSON, see example")
 
     args = vars(parser.parse_args())
@@ -728,79 +1062,151 @@ def main():
         print('Done.')
         return
 
-    if not os.path.isdir('tarballs'):
-        print('Downloading sources:')
-        download_sources(config['binutils'], config['gdb'], config['gcc'], config['mingw'], config['mtools'])
+    if args['make_image']:
+        print(f'Building image {args["image"]}...')
+        size = args['image_size'] or config.get('image_size', 64)
+        if not build_image(args['make_image'], args['image'], size, config.get('image_label', 'HAL9000'), config['mtools_prefix']):
+            print('Image build failed.')
+            sys.exit(1)
         print('Done.')
+        return
 
-    if not os.path.isdir('sources'):
-        print('Extracting sources...')
-        extract_sources()
+    profile_name = args['profile'] or config.get('build_profile', 'default')
+    profiles = config.get('build_profiles', {})
+    if profile_name != 'default' and profile_name not in profiles:
+        print(f'Unknown build profile {profile_name}')
+        sys.exit(1)
+    profile = profiles.get(profile_name, {})
+    corpus = config.get('corpus', 'corpus')
+    targets = get_targets(config)
+    jobs = args['jobs'] or config.get('jobs', 16)
+
+    legacy_targets = ['mingw', 'elf', 'win_mingw', 'win_elf']
+    build_names = [name for name in legacy_targets if args[f'build_{name}']]
+    pack_names = [name for name in legacy_targets if args[f'pack_{name}']]
+    for option, names in [('build', build_names), ('pack', pack_names)]:
+        if args[option]:
+            selected = list(targets) if args[option] == 'all' else args[option].split(',')
+            names += [name for name in selected if name not in names]
+
+    # Older configurations had mingw_prefix, elf_prefix, mingw_win_prefix and elf_win_prefix instead
+    if 'targets' not in config and (build_names or pack_names or args['verify'] or args['bench_profile']):
+        print(f'{args["config"]} has no targets list, replace mingw_prefix, elf_prefix, mingw_win_prefix and elf_win_prefix')
+        print('with the target descriptors from the example config.json')
+        sys.exit(1)
+
+    # Verifying, benchmarking and packing work on the installed prefixes and do not need the sources
+    needs_sources = build_names or args['build_mtools'] or args['build_win_mtools'] or args['download']
+
+    if needs_sources and not os.path.isdir('tarballs'):
+        print('Downloading sources:')
+        download_sources(config['binutils'], config['gdb'], config['gcc'], config['mingw'], config['mtools'],
+                         config.get('gnu_mirror'), config.get('mingw_mirror'))
         print('Done.')
 
-    if args['build_mingw']:
-        print('Building MinGW toolchain...')
-        build_mingw_toolchain(config['mingw_prefix'])
-        print('Done.')
+    if args['download']:
+        return
 
-    if args['build_elf']:
-        print('Building ELF toolchain...')
-        build_elf_toolchain(config['elf_prefix'])
+    if needs_sources and not os.path.isdir('sources'):
+        print('Extracting sources...')
+        extract_sources()
         print('Done.')
 
-    if args['build_win_mingw']:
-        print('Building Windows MinGW toolchain...')
-        build_win_mingw(config['mingw_win_prefix'], config['mingw_prefix'])
+    if build_names:
+        print(f'Building {", ".join(build_names)} ({profile_name} profile)...')
+        if not build_targets(config, build_names, profile, profile_name, corpus, jobs):
+            print('Build failed.')
+            sys.exit(1)
         print('Done.')
 
-    if args['build_win_elf']:
-        print('Building Windows ELF toolchain...')
-        build_win_elf(config['elf_win_prefix'], config['mingw_prefix'], config['elf_prefix'], config['mingw_win_prefix'])
-        print('Done.')
-    
     if args['build_mtools']:
         print('Building mtools...')
-        build_mtools(config['mtools_prefix'])
+        if not build_mtools(config['mtools_prefix']):
+            print('Build failed.')
+            sys.exit(1)
         print('Done.')
 
     if args['build_win_mtools']:
         print('Building mtools...')
-        build_win_mtools(config['mtools_win_prefix'], config['mingw_prefix'])
+        mingw_prefix = targets['mingw']['prefix'] if 'mingw' in targets else config['mingw_prefix']
+        if not build_win_mtools(config['mtools_win_prefix'], mingw_prefix):
+            print('Build failed.')
+            sys.exit(1)
+        print('Done.')
+
+    if args['bench_profile']:
+        bench_prefix = config.get('bench_prefix', 'bench')
+        os.makedirs(bench_prefix, exist_ok=True)
+        installed = [d for d in targets.values() if not d.get('host') and os.path.isfile(f'{d["prefix"]}/bin/{d["target"]}-gcc')]
+        if not all(check_build_profile(descriptor, profile_name) for descriptor in installed):
+            sys.exit(1)
+        print(f'Benchmarking {profile_name} profile...')
+        results = {}
+        measured = 0
+        for descriptor in installed:
+            target = descriptor['target']
+            result = benchmark_compiler(descriptor['prefix'], target, corpus, descriptor.get('corpus_cflags', ''))
+            if result is None:
+                print(f'   {target} failed to compile the corpus')
+                continue
+            result['versions'] = get_versions(config)
+            results = record_profile_benchmark(bench_prefix, profile_name, target, result)
+            measured += 1
+        print_profile_benchmark(results)
+        # Nothing measured is no benchmark
+        if not measured:
+            print('No compiler was benchmarked.')
+            sys.exit(1)
+        print('Done.')
+
+    if args['verify']:
+        bench_prefix = config.get('bench_prefix', 'bench')
+        os.makedirs(bench_prefix, exist_ok=True)
+        verifiable = get_verifiable_targets(targets)
+        verify_names = verifiable if args['verify'] == 'all' else args['verify'].split(',')
+        for name in verify_names:
+            if name not in verifiable:
+                print(f'Target {name} cannot be verified on this machine')
+                sys.exit(1)
+        if not all(check_build_profile(targets[name], profile_name) for name in verify_names):
+            sys.exit(1)
+        print('Verifying toolchains...')
+        record = verify_toolchains(config, corpus, profile_name, verify_names)
+        previous = record_verification(bench_prefix, record)
+        print_verification(record, previous)
+        # Nothing verified is no evidence that the toolchains work
+        if not record['results'] or not all(result['ok'] for result in record['results'].values()):
+            print('Verification failed.')
+            sys.exit(1)
         print('Done.')
 
     os_name = str(platform.system()).lower()
     arch = str(platform.machine()).lower()
 
-    if args['pack_mingw']:
+    for name in pack_names:
+        if name not in targets:
+            print(f'Unknown target {name}')
+            sys.exit(1)
+        descriptor = targets[name]
+        if not os.path.isdir(descriptor['prefix']):
+            print(f'{descriptor["prefix"]} does not exist, build {name} before packing it')
+            sys.exit(1)
+        # Compilers built with a mingw host run on Windows, host profiles only apply to the native ones
+        pack_arch, pack_os = ('amd64', 'windows') if 'mingw' in descriptor.get('host', '') else (arch, os_name)
+        if not check_build_profile(descriptor, profile_name):
+            sys.exit(1)
+        pack_profile = get_build_profile(descriptor['prefix'])
         os.makedirs(config['archive_prefix'], exist_ok=True)
-        print(f'Packing MinGW for {arch}-{os_name}')
-        pack_compiler(config['archive_prefix'], config['mingw_prefix'], arch, os_name, 'mingw')
+        print(f'Packing {name} for {pack_arch}-{pack_os} ({pack_profile} profile)')
+        pack_compiler(config['archive_prefix'], descriptor['prefix'], pack_arch, pack_os, descriptor['archive'], pack_profile)
         print('Done.')
 
-    if args['pack_elf']:
-        os.makedirs(config['archive_prefix'], exist_ok=True)
-        print(f'Packing ELF for {arch}-{os_name}')
-        pack_compiler(config['archive_prefix'], config['elf_prefix'], arch, os_name, 'elf')
-        print('Done.')
-    
     if args['pack_mtools']:
         os.makedirs(config['archive_prefix'], exist_ok=True)
         print(f'Packing mtools for {arch}-{os_name}')
         pack_mtools(config['archive_prefix'], config['mtools_prefix'], arch, os_name)
         print('Done.')
     
-    if args['pack_win_mingw']:
-        os.makedirs(config['archive_prefix'], exist_ok=True)
-        print(f'Packing MinGW for amd64-windows')
-        pack_compiler(config['archive_prefix'], config['mingw_win_prefix'], 'amd64', 'windows', 'mingw')
-        print('Done.')
-
-    if args['pack_win_elf']:
-        os.makedirs(config['archive_prefix'], exist_ok=True)
-        print(f'Packing ELF for amd64-windows')
-        pack_compiler(config['archive_prefix'], config['elf_win_prefix'], 'amd64', 'windows', 'elf')
-        print('Done.')
-
     if args['pack_win_mtools']:
         os.makedirs(config['archive_prefix'], exist_ok=True)
         print(f'Packing mtools for amd64-windows')
@@ -0,0 +1,395 @@
+import os
+import re
+import sys
+import argparse
+import time
+import json
+import glob
+import shutil
+import hashlib
+import threading
+import subprocess
+import socketserver
+import http.server
+
+import build_linux_mac
+
+# Keys that change what gets built, everything else (jobs, mirrors, image settings) does not
+VERSION_KEYS = ['binutils', 'gdb', 'gcc', 'mingw', 'mtools']
+
+# Versions end up in download URLs and file names
+VERSION_PATTERN = re.compile(r'[0-9A-Za-z][0-9A-Za-z._+-]*')
+
+SCRIPT = os.path.join(os.path.dirname(os.path.abspath(__file__)), 'build_linux_mac.py')
+
+def get_required_targets(targets, names):
+    required = []
+    def visit(name):
+        if name in required:
+            return
+        for r in targets[name].get('requires', []):
+            visit(r)
+        required.append(name)
+    for name in names:
+        visit(name)
+    return required
+
+def get_corpus_hash(corpus):
+    digest = hashlib.sha256()
+    for path in build_linux_mac.get_corpus_sources(corpus):
+        digest.update(os.path.basename(path).encode('utf-8'))
+        digest.update(build_linux_mac.get_file_hash(path).encode('utf-8'))
+    return digest.hexdigest()
+
+def get_build_key(config, names, profile_name):
+    targets = build_linux_mac.get_targets(config)
+    profile = config.get('build_profiles', {}).get(profile_name, {})
+    key = {
+        'versions': {k: config[k] for k in VERSION_KEYS},
+        'profile': profile,
+        'targets': [targets[name] for name in get_required_targets(targets, names)],
+        'pack': sorted(names)
+    }
+    # The pgo profile is trained on the corpus, a different corpus gives a different compiler
+    if profile.get('pgo'):
+        key['corpus'] = get_corpus_hash(config['corpus'])
+    return hashlib.sha256(json.dumps(key, sort_keys=True).encode('utf-8')).hexdigest()[:16]
+
+def get_sources_key(config):
+    versions = json.dumps({k: config[k] for k in VERSION_KEYS}, sort_keys=True)
+    return hashlib.sha256(versions.encode('utf-8')).hexdigest()[:16]
+
+def prune_workdir(workdir, keep):
+    for filename in os.listdir(workdir):
+        path = os.path.join(workdir, filename)
+        if filename in keep:
+            continue
+        if os.path.isdir(path) and not os.path.islink(path):
+            shutil.rmtree(path, ignore_errors=True)
+        else:
+            os.remove(path)
+
+def write_json(path, data):
+    f = open(f'{path}.tmp', 'w')
+    json.dump(data, f, indent=4)
+    f.close()
+    os.replace(f'{path}.tmp', path)
+
+class BuildService:
+    def __init__(self, config, root, jobs):
+        self.config = config
+        self.root = os.path.abspath(root)
+        self.jobs = jobs
+        self.free = jobs
+        self.builds = {}
+        self.queue = []
+        self.source_locks = {}
+        self.condition = threading.Condition()
+        os.makedirs(self.root, exist_ok=True)
+        self.load_cache()
+
+    def load_cache(self):
+        # Finished builds survive restarts, interrupted ones are built again when requested
+        for key in os.listdir(self.root):
+            path = os.path.join(self.root, key, 'build.json')
+            if not os.path.isfile(path):
+                continue
+            f = open(path, 'r')
+            build = json.load(f)
+            f.close()
+            if build['state'] == 'done' and all(os.path.isfile(self.get_archive_path(build, a)) for a in build['archives']):
+                self.builds[key] = build
+        print(f'   Loaded {len(self.builds)} cached builds from {self.root}')
+
+    def get_archive_path(self, build, filename):
+        return os.path.join(self.root, build['key'], build['archive_prefix'], filename)
+
+    def submit(self, request):
+        if not isinstance(request, dict) or not isinstance(request.get('config', {}), dict):
+            return 400, {'error': 'The request must be a JSON object, config a JSON object of versions'}
+        # Requests only pick versions, paths, profiles and commands stay under the control of the service configuration
+        overrides = request.get('config', {})
+        for k, v in overrides.items():
+            if k not in VERSION_KEYS:
+                return 400, {'error': f'{k} cannot be set by a request, only {", ".join(VERSION_KEYS)}'}
+            if not isinstance(v, str) or not VERSION_PATTERN.fullmatch(v) or '..' in v:
+                return 400, {'error': f'Invalid {k} version {v}'}
+        config = dict(self.config)
+        config.update(overrides)
+        config['corpus'] = os.path.abspath(config.get('corpus', 'corpus'))
+        targets = build_linux_mac.get_targets(config)
+        names = request.get('targets', [])
+        if isinstance(names, str):
+            names = list(targets) if names == 'all' else names.split(',')
+        if not isinstance(names, list) or not all(isinstance(name, str) for name in names):
+            return 400, {'error': 'targets must be a list of target names'}
+        if not names:
+            return 400, {'error': 'No targets requested'}
+        for name in names:
+            if name not in targets:
+                return 400, {'error': f'Unknown target {name}'}
+        try:
+            get_required_targets(targets, names)
+        except KeyError as e:
+            return 400, {'error': f'Unknown required target {e.args[0]}'}
+        profile_name = request.get('profile') or config.get('build_profile', 'default')
+        if not isinstance(profile_name, str) or (profile_name != 'default' and profile_name not in config.get('build_profiles', {})):
+            return 400, {'error': f'Unknown build profile {profile_name}'}
+        try:
+            jobs = min(int(request.get('jobs') or config.get('jobs', 16)), self.jobs)
+        except (TypeError, ValueError):
+            return 400, {'error': f'Invalid jobs {request.get("jobs")}'}
+
+        key = get_build_key(config, names, profile_name)
+        with self.condition:
+            build = self.builds.get(key)
+            if build and build['state'] in ['queued', 'running']:
+                build['requests'] += 1
+                return 200, build
+            if build and build['state'] == 'done':
+                build['requests'] += 1
+                return 200, build
+
+            build = {
+                'key': key,
+                'targets': names,
+                'profile': profile_name,
+                'jobs': max(jobs, 1),
+                'state': 'queued',
+                'requests': 1,
+                'archive_prefix': config['archive_prefix'],
+                'archives': [],
+                'submitted': time.time(),
+                'started': None,
+                'finished': None
+            }
+            self.builds[key] = build
+            self.queue.append(build)
+            workdir = os.path.join(self.root, key)
+            os.makedirs(workdir, exist_ok=True)
+            write_json(os.path.join(workdir, 'config.json'), config)
+            write_json(os.path.join(workdir, 'build.json'), build)
+            print(f'   Queued {key}: {",".join(names)} ({profile_name} profile, {build["jobs"]} jobs)')
+            self.condition.notify_all()
+        return 202, build
+
+    def schedule(self):
+        with self.condition:
+            while True:
+                # First in first out, a large build at the head is not overtaken by smaller ones
+                while not self.queue or self.queue[0]['jobs'] > self.free:
+                    self.condition.wait()
+                build = self.queue.pop(0)
+                self.free -= build['jobs']
+                build['state'] = 'running'
+                build['started'] = time.time()
+                threading.Thread(target=self.run, args=(build,), daemon=True).start()
+
+    def prepare_sources(self, config):
+        # Tarballs are downloaded once per set of versions and shared by every build using them
+        key = get_sources_key(config)
+        directory = os.path.join(self.root, 'tarballs', key)
+        with self.condition:
+            lock = self.source_locks.setdefault(key, threading.Lock())
+        with lock:
+            if os.path.isdir(os.path.join(directory, 'tarballs')):
+                return os.path.join(directory, 'tarballs')
+            os.makedirs(directory, exist_ok=True)
+            write_json(os.path.join(directory, 'config.json'), config)
+            log = open(os.path.join(directory, 'download.log'), 'w')
+            p = subprocess.run([sys.executable, SCRIPT, '--config', 'config.json', '--download'],
+                               stdout=log,
+                               stderr=subprocess.STDOUT,
+                               cwd=directory)
+            log.close()
+            if p.returncode != 0:
+                # Partial downloads would be taken for complete ones by the next build
+                shutil.rmtree(os.path.join(directory, 'tarballs'), ignore_errors=True)
+                return None
+            return os.path.join(directory, 'tarballs')
+
+    def execute(self, build, workdir, config):
+        # Retries start from scratch, a partial extraction or stale build trees would fail them the same way
+        prune_workdir(workdir, ['config.json', 'build.json'])
+        ok = False
+        log = open(os.path.join(workdir, 'build.log'), 'w')
+        try:
+            tarballs = self.prepare_sources(config)
+            if not tarballs:
+                log.write(f'Downloading the sources failed, see {self.root}/tarballs/{get_sources_key(config)}/download.log\n')
+                return False
+            os.symlink(tarballs, os.path.join(workdir, 'tarballs'))
+            names = get_required_targets(build_linux_mac.get_targets(config), build['targets'])
+            command = [sys.executable, SCRIPT, '--config', 'config.json',
+                       '--build', ','.join(names),
+                       '--pack', ','.join(build['targets']),
+                       '--profile', build['profile'],
+                       '--jobs', str(build['jobs'])]
+            p = subprocess.run(command,
+                               stdout=log,
+                               stderr=subprocess.STDOUT,
+                               cwd=workdir)
+            # Concurrent targets log to build/<name>.log, keep their output once the build trees are gone
+            for path in sorted(glob.glob(os.path.join(workdir, 'build', '*.log'))):
+                f = open(path, 'r', errors='replace')
+                log.write(f'\n==> {os.path.basename(path)} <==\n')
+                shutil.copyfileobj(f, log)
+                f.close()
+            ok = p.returncode == 0
+        finally:
+            log.close()
+            # Build trees, sources and prefixes take several GB per build, failed ones included
+            keep = ['build.json', 'config.json', 'build.log']
+            if ok:
+                keep.append(config['archive_prefix'].replace(os.sep, '/').split('/')[0])
+            prune_workdir(workdir, keep)
+        return ok
+
+    def run(self, build):
+        key = build['key']
+        workdir = os.path.join(self.root, key)
+        print(f'   Building {key}...')
+        ok = False
+        archives = []
+        try:
+            f = open(os.path.join(workdir, 'config.json'), 'r')
+            config = json.load(f)
+            f.close()
+            ok = self.execute(build, workdir, config)
+            archive_dir = os.path.join(workdir, config['archive_prefix'])
+            if ok and os.path.isdir(archive_dir):
+                archives = sorted(os.listdir(archive_dir))
+        except Exception as e:
+            print(f'   Build {key} raised {type(e).__name__}: {e}')
+            ok = False
+        finally:
+            # The jobs go back to the budget whatever happened, or the queue stalls for good
+            with self.condition:
+                self.free += build['jobs']
+                build['finished'] = time.time()
+                build['state'] = 'done' if ok else 'failed'
+                build['archives'] = archives
+                write_json(os.path.join(workdir, 'build.json'), build)
+                self.condition.notify_all()
+        print(f'   Build {key} {build["state"]} in %.1f s' % (build['finished'] - build['started']))
+
+    def status(self):
+        with self.condition:
+            return {
+                'jobs': self.jobs,
+                'free': self.free,
+                'queued': [build['key'] for build in self.queue],
+                'builds': list(self.builds.values())
+            }
+
+class BuildHandler(http.server.BaseHTTPRequestHandler):
+    service = None
+
+    def log_message(self, format, *args):
+        pass
+
+    def address_string(self):
+        # Unix socket clients have no address
+        return str(self.client_address[0]) if self.client_address else 'local'
+
+    def send_json(self, code, data):
+        body = json.dumps(data, indent=4).encode('utf-8')
+        self.send_response(code)
+        self.send_header('Content-Type', 'application/json')
+        self.send_header('Content-Length', str(len(body)))
+        self.end_headers()
+        self.wfile.write(body)
+
+    def send_file(self, path, content_type):
+        self.send_response(200)
+        self.send_header('Content-Type', content_type)
+        self.send_header('Content-Length', str(os.path.getsize(path)))
+        self.end_headers()
+        f = open(path, 'rb')
+        shutil.copyfileobj(f, self.wfile)
+        f.close()
+
+    def do_POST(self):
+        if self.path.rstrip('/') != '/builds':
+            self.send_json(404, {'error': f'Unknown path {self.path}'})
+            return
+        try:
+            request = json.loads(self.rfile.read(int(self.headers.get('Content-Length', 0))) or b'{}')
+        except ValueError as e:
+            self.send_json(400, {'error': f'Invalid request: {e}'})
+            return
+        try:
+            code, data = self.service.submit(request)
+        except Exception as e:
+            code, data = 500, {'error': f'{type(e).__name__}: {e}'}
+        self.send_json(code, data)
+
+    def do_GET(self):
+        parts = [part for part in self.path.split('/') if part]
+        builds = self.service.builds
+        if parts == ['builds']:
+            self.send_json(200, self.service.status())
+        elif len(parts) == 2 and parts[0] == 'builds' and parts[1] in builds:
+            self.send_json(200, builds[parts[1]])
+        elif len(parts) == 3 and parts[0] == 'builds' and parts[1] in builds and parts[2] == 'log':
+            path = os.path.join(self.service.root, parts[1], 'build.log')
+            if os.path.isfile(path):
+                self.send_file(path, 'text/plain')
+            else:
+                self.send_json(404, {'error': 'No log yet'})
+        elif len(parts) == 3 and parts[0] == 'archives' and parts[1] in builds and parts[2] in builds[parts[1]]['archives']:
+            self.send_file(self.service.get_archive_path(builds[parts[1]], parts[2]), 'application/x-xz')
+        else:
+            self.send_json(404, {'error': f'Unknown path {self.path}'})
+
+class UnixHTTPServer(socketserver.ThreadingUnixStreamServer):
+    daemon_threads = True
+
+def main():
+    parser = argparse.ArgumentParser(
+        prog = 'build_service',
+        description='Serve toolchain builds and archives to several users of one build machine'
+    )
+
+    parser.add_argument('-config', '--config', type=str, required=True)
+    parser.add_argument('--port', type=int, help="TCP port to listen on, 127.0.0.1 only")
+    parser.add_argument('--socket', type=str, help="Listen on this Unix socket instead of TCP")
+    parser.add_argument('--jobs', type=int, help="Make jobs shared by all running builds")
+    parser.add_argument('--root', type=str, help="Directory holding the build workdirs and the archive cache")
+
+    args = vars(parser.parse_args())
+
+    f = open(args['config'], 'r')
+    config = json.load(f)
+    f.close()
+
+    # Each build packs into its own directory, which is emptied before the build
+    archive_prefix = config['archive_prefix']
+    if os.path.isabs(archive_prefix) or '..' in archive_prefix.replace(os.sep, '/').split('/'):
+        print(f'archive_prefix must be a relative path without .., not {archive_prefix}')
+        sys.exit(1)
+
+    jobs = args['jobs'] or os.cpu_count()
+    root = args['root'] or config.get('service_prefix', 'service')
+    service = BuildService(config, root, jobs)
+    threading.Thread(target=service.schedule, daemon=True).start()
+
+    handler = type('Handler', (BuildHandler,), {'service': service})
+    if args['socket']:
+        if os.path.exists(args['socket']):
+            os.remove(args['socket'])
+        server = UnixHTTPServer(args['socket'], handler)
+        print(f'Build service listening on {args["socket"]} with {jobs} jobs')
+    else:
+        port = args['port'] or config.get('service_port', 9000)
+        server = http.server.ThreadingHTTPServer(('127.0.0.1', port), handler)
+        print(f'Build service listening on http://127.0.0.1:{port} with {jobs} jobs')
+
+    try:
+        server.serve_forever()
+    except KeyboardInterrupt:
+        pass
+    server.server_close()
+
+if __name__ == "__main__":
+    main()
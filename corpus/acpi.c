@@ -0,0 +1,87 @@
+#include "efi.h"
+
+typedef struct __attribute__((packed)) {
+    CHAR8 Signature[8];
+    UINT8 Checksum;
+    CHAR8 OemId[6];
+    UINT8 Revision;
+    UINT32 RsdtAddress;
+    UINT32 Length;
+    UINT64 XsdtAddress;
+    UINT8 ExtendedChecksum;
+    UINT8 Reserved[3];
+} acpi_rsdp;
+
+typedef struct __attribute__((packed)) {
+    CHAR8 Signature[4];
+    UINT32 Length;
+    UINT8 Revision;
+    UINT8 Checksum;
+    CHAR8 OemId[6];
+    CHAR8 OemTableId[8];
+    UINT32 OemRevision;
+    UINT32 CreatorId;
+    UINT32 CreatorRevision;
+} acpi_header;
+
+static const EFI_GUID acpi_20_guid = {
+    0x8868E871, 0xE4F1, 0x11D3, { 0xBC, 0x22, 0x00, 0x80, 0xC7, 0x3C, 0x88, 0x81 }
+};
+
+static const EFI_GUID acpi_10_guid = {
+    0xEB9D2D30, 0x2D88, 0x11D3, { 0x9A, 0x16, 0x00, 0x90, 0x27, 0x3F, 0xC1, 0x4D }
+};
+
+static BOOLEAN acpi_checksum(const VOID *table, UINTN length)
+{
+    const UINT8 *p = (const UINT8 *) table;
+    UINT8 sum = 0;
+
+    for (UINTN i = 0; i < length; i++)
+        sum = (UINT8) (sum + p[i]);
+    return sum == 0;
+}
+
+static acpi_rsdp *acpi_find_rsdp(EFI_SYSTEM_TABLE *system_table)
+{
+    acpi_rsdp *fallback = NULL;
+
+    for (UINTN i = 0; i < system_table->NumberOfTableEntries; i++) {
+        EFI_CONFIGURATION_TABLE *entry = &system_table->ConfigurationTable[i];
+        if (guid_equal(&entry->VendorGuid, &acpi_20_guid))
+            return (acpi_rsdp *) entry->VendorTable;
+        if (guid_equal(&entry->VendorGuid, &acpi_10_guid))
+            fallback = (acpi_rsdp *) entry->VendorTable;
+    }
+    return fallback;
+}
+
+VOID *acpi_find_table(EFI_SYSTEM_TABLE *system_table, const CHAR8 signature[4])
+{
+    acpi_rsdp *rsdp = acpi_find_rsdp(system_table);
+    BOOLEAN extended;
+    acpi_header *root;
+    UINTN entries;
+
+    if (!rsdp || memcmp(rsdp->Signature, "RSD PTR ", 8) != 0)
+        return NULL;
+    if (!acpi_checksum(rsdp, 20))
+        return NULL;
+
+    extended = rsdp->Revision >= 2 && rsdp->XsdtAddress != 0;
+    root = (acpi_header *) (UINTN) (extended ? rsdp->XsdtAddress : rsdp->RsdtAddress);
+    if (!acpi_checksum(root, root->Length))
+        return NULL;
+
+    entries = (root->Length - sizeof(acpi_header)) / (extended ? 8 : 4);
+    for (UINTN i = 0; i < entries; i++) {
+        const UINT8 *slot = (const UINT8 *) (root + 1) + i * (extended ? 8 : 4);
+        UINT64 address = 0;
+        memcpy(&address, slot, extended ? 8 : 4);
+
+        acpi_header *table = (acpi_header *) (UINTN) address;
+        if (memcmp(table->Signature, signature, 4) == 0 && acpi_checksum(table, table->Length))
+            return table;
+    }
+    return NULL;
+}
@@ -0,0 +1,155 @@
+#include "efi.h"
+
+#define CONSOLE_BUFFER 256
+
+static EFI_SIMPLE_TEXT_OUTPUT_PROTOCOL *console_out;
+static CHAR16 console_buffer[CONSOLE_BUFFER];
+static UINTN console_length;
+
+static VOID console_flush(VOID)
+{
+    if (console_length == 0)
+        return;
+    console_buffer[console_length] = 0;
+    if (console_out)
+        console_out->OutputString(console_out, console_buffer);
+    console_length = 0;
+}
+
+static VOID console_putc(CHAR8 c)
+{
+    if (c == '\n')
+        console_putc('\r');
+    console_buffer[console_length++] = (CHAR16) (UINT8) c;
+    if (console_length == CONSOLE_BUFFER - 1 || c == '\n')
+        console_flush();
+}
+
+static UINTN console_puts(const CHAR8 *str, UINTN width, BOOLEAN left)
+{
+    UINTN length = strlen(str);
+    UINTN written = 0;
+
+    while (!left && width > length + written) {
+        console_putc(' ');
+        written++;
+    }
+    for (UINTN i = 0; i < length; i++)
+        console_putc(str[i]);
+    written += length;
+    while (left && width > written) {
+        console_putc(' ');
+        written++;
+    }
+    return written;
+}
+
+static UINTN console_number(UINT64 value, UINTN base, BOOLEAN negative, UINTN width, CHAR8 pad, BOOLEAN upper)
+{
+    const CHAR8 *digits = upper ? "0123456789ABCDEF" : "0123456789abcdef";
+    CHAR8 buffer[32];
+    UINTN index = sizeof(buffer) - 1;
+    UINTN written = 0;
+
+    buffer[index] = 0;
+    do {
+        buffer[--index] = digits[value % base];
+        value /= base;
+    } while (value);
+    if (negative)
+        buffer[--index] = '-';
+    while (width > sizeof(buffer) - 1 - index) {
+        if (pad == '0' && negative && index < sizeof(buffer) - 1 && buffer[index] == '-') {
+            console_putc('-');
+            buffer[index++] = '0';
+            written++;
+        }
+        console_putc(pad);
+        width--;
+        written++;
+    }
+    return written + console_puts(&buffer[index], 0, FALSE);
+}
+
+VOID console_init(EFI_SYSTEM_TABLE *system_table)
+{
+    console_out = system_table ? system_table->ConOut : NULL;
+    console_length = 0;
+}
+
+UINTN console_printf(const CHAR8 *format, ...)
+{
+    va_list args;
+    UINTN written = 0;
+
+    va_start(args, format);
+    for (const CHAR8 *p = format; *p; p++) {
+        if (*p != '%') {
+            console_putc(*p);
+            written++;
+            continue;
+        }
+
+        BOOLEAN left = FALSE;
+        BOOLEAN is_long = FALSE;
+        CHAR8 pad = ' ';
+        UINTN width = 0;
+
+        p++;
+        if (*p == '-') {
+            left = TRUE;
+            p++;
+        }
+        if (*p == '0') {
+            pad = '0';
+            p++;
+        }
+        while (*p >= '0' && *p <= '9')
+            width = width * 10 + (UINTN) (*p++ - '0');
+        while (*p == 'l') {
+            is_long = TRUE;
+            p++;
+        }
+
+        switch (*p) {
+        case 'd': {
+            INT64 value = is_long ? va_arg(args, INT64) : va_arg(args, INT32);
+            written += console_number(value < 0 ? (UINT64) -value : (UINT64) value, 10, value < 0, width, pad, FALSE);
+            break;
+        }
+        case 'u':
+            written += console_number(is_long ? va_arg(args, UINT64) : va_arg(args, UINT32), 10, FALSE, width, pad, FALSE);
+            break;
+        case 'x':
+        case 'X':
+            written += console_number(is_long ? va_arg(args, UINT64) : va_arg(args, UINT32), 16, FALSE, width, pad, *p == 'X');
+            break;
+        case 'p':
+            written += console_puts("0x", 0, FALSE);
+            written += console_number((UINTN) va_arg(args, VOID *), 16, FALSE, sizeof(VOID *) * 2, '0', FALSE);
+            break;
+        case 's': {
+            const CHAR8 *str = va_arg(args, const CHAR8 *);
+            written += console_puts(str ? str : "(null)", width, left);
+            break;
+        }
+        case 'c':
+            console_putc((CHAR8) va_arg(args, int));
+            written++;
+            break;
+        case '%':
+            console_putc('%');
+            written++;
+            break;
+        default:
+            console_putc('?');
+            written++;
+            break;
+        }
+        if (*p == 0)
+            break;
+    }
+    va_end(args);
+    console_flush();
+    return written;
+}
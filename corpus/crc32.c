@@ -0,0 +1,52 @@
+#include "efi.h"
+
+static UINT32 crc32_table[8][256];
+static BOOLEAN crc32_ready;
+
+static VOID crc32_init(VOID)
+{
+    for (UINT32 i = 0; i < 256; i++) {
+        UINT32 crc = i;
+        for (int bit = 0; bit < 8; bit++)
+            crc = (crc >> 1) ^ (0xEDB88320u & (0u - (crc & 1)));
+        crc32_table[0][i] = crc;
+    }
+    for (UINT32 i = 0; i < 256; i++) {
+        for (int slice = 1; slice < 8; slice++) {
+            UINT32 prev = crc32_table[slice - 1][i];
+            crc32_table[slice][i] = (prev >> 8) ^ crc32_table[0][prev & 0xFF];
+        }
+    }
+    crc32_ready = TRUE;
+}
+
+UINT32 crc32(const VOID *data, UINTN size, UINT32 seed)
+{
+    const UINT8 *p = (const UINT8 *) data;
+    UINT32 crc = ~seed;
+
+    if (!crc32_ready)
+        crc32_init();
+
+    while (size && ((UINTN) p & 7)) {
+        crc = (crc >> 8) ^ crc32_table[0][(crc ^ *p++) & 0xFF];
+        size--;
+    }
+    while (size >= 8) {
+        UINT32 lo = *(const UINT32 *) p ^ crc;
+        UINT32 hi = *(const UINT32 *) (p + 4);
+        crc = crc32_table[7][lo & 0xFF] ^
+              crc32_table[6][(lo >> 8) & 0xFF] ^
+              crc32_table[5][(lo >> 16) & 0xFF] ^
+              crc32_table[4][lo >> 24] ^
+              crc32_table[3][hi & 0xFF] ^
+              crc32_table[2][(hi >> 8) & 0xFF] ^
+              crc32_table[1][(hi >> 16) & 0xFF] ^
+              crc32_table[0][hi >> 24];
+        p += 8;
+        size -= 8;
+    }
+    while (size--)
+        crc = (crc >> 8) ^ crc32_table[0][(crc ^ *p++) & 0xFF];
+    return ~crc;
+}
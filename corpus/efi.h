@@ -0,0 +1,198 @@
+#ifndef CORPUS_EFI_H
+#define CORPUS_EFI_H
+
+typedef __UINT8_TYPE__ UINT8;
+typedef __UINT16_TYPE__ UINT16;
+typedef __UINT32_TYPE__ UINT32;
+typedef __UINT64_TYPE__ UINT64;
+typedef __INT8_TYPE__ INT8;
+typedef __INT16_TYPE__ INT16;
+typedef __INT32_TYPE__ INT32;
+typedef __INT64_TYPE__ INT64;
+typedef __UINTPTR_TYPE__ UINTN;
+typedef __INTPTR_TYPE__ INTN;
+typedef __SIZE_TYPE__ size_t;
+typedef UINT8 BOOLEAN;
+typedef UINT16 CHAR16;
+typedef char CHAR8;
+typedef void VOID;
+typedef UINTN EFI_STATUS;
+typedef VOID *EFI_HANDLE;
+typedef VOID *EFI_EVENT;
+typedef UINT64 EFI_PHYSICAL_ADDRESS;
+typedef UINT64 EFI_VIRTUAL_ADDRESS;
+typedef __builtin_va_list va_list;
+
+#define va_start(ap, last) __builtin_va_start(ap, last)
+#define va_arg(ap, type) __builtin_va_arg(ap, type)
+#define va_end(ap) __builtin_va_end(ap)
+
+#define TRUE ((BOOLEAN) 1)
+#define FALSE ((BOOLEAN) 0)
+#define NULL ((VOID *) 0)
+
+#if defined(__x86_64__) && !defined(_WIN32)
+#define EFIAPI __attribute__((ms_abi))
+#else
+#define EFIAPI
+#endif
+
+#define EFI_ERROR_BIT (((UINTN) 1) << (sizeof(UINTN) * 8 - 1))
+#define EFI_SUCCESS 0
+#define EFI_LOAD_ERROR (EFI_ERROR_BIT | 1)
+#define EFI_INVALID_PARAMETER (EFI_ERROR_BIT | 2)
+#define EFI_UNSUPPORTED (EFI_ERROR_BIT | 3)
+#define EFI_BUFFER_TOO_SMALL (EFI_ERROR_BIT | 5)
+#define EFI_OUT_OF_RESOURCES (EFI_ERROR_BIT | 9)
+#define EFI_NOT_FOUND (EFI_ERROR_BIT | 14)
+#define EFI_ERROR(status) (((INTN) (status)) < 0)
+
+#define EFI_PAGE_SIZE 4096
+#define EFI_SIZE_TO_PAGES(size) (((size) + EFI_PAGE_SIZE - 1) / EFI_PAGE_SIZE)
+
+typedef struct {
+    UINT32 Data1;
+    UINT16 Data2;
+    UINT16 Data3;
+    UINT8 Data4[8];
+} EFI_GUID;
+
+typedef struct {
+    UINT64 Signature;
+    UINT32 Revision;
+    UINT32 HeaderSize;
+    UINT32 CRC32;
+    UINT32 Reserved;
+} EFI_TABLE_HEADER;
+
+typedef enum {
+    EfiReservedMemoryType,
+    EfiLoaderCode,
+    EfiLoaderData,
+    EfiBootServicesCode,
+    EfiBootServicesData,
+    EfiRuntimeServicesCode,
+    EfiRuntimeServicesData,
+    EfiConventionalMemory,
+    EfiUnusableMemory,
+    EfiACPIReclaimMemory,
+    EfiACPIMemoryNVS,
+    EfiMemoryMappedIO,
+    EfiMemoryMappedIOPortSpace,
+    EfiPalCode,
+    EfiPersistentMemory,
+    EfiMaxMemoryType
+} EFI_MEMORY_TYPE;
+
+typedef enum {
+    AllocateAnyPages,
+    AllocateMaxAddress,
+    AllocateAddress,
+    MaxAllocateType
+} EFI_ALLOCATE_TYPE;
+
+typedef struct {
+    UINT32 Type;
+    EFI_PHYSICAL_ADDRESS PhysicalStart;
+    EFI_VIRTUAL_ADDRESS VirtualStart;
+    UINT64 NumberOfPages;
+    UINT64 Attribute;
+} EFI_MEMORY_DESCRIPTOR;
+
+struct _EFI_SIMPLE_TEXT_OUTPUT_PROTOCOL;
+
+typedef EFI_STATUS (EFIAPI *EFI_TEXT_STRING)(struct _EFI_SIMPLE_TEXT_OUTPUT_PROTOCOL *This, CHAR16 *String);
+typedef EFI_STATUS (EFIAPI *EFI_TEXT_RESET)(struct _EFI_SIMPLE_TEXT_OUTPUT_PROTOCOL *This, BOOLEAN ExtendedVerification);
+
+typedef struct _EFI_SIMPLE_TEXT_OUTPUT_PROTOCOL {
+    EFI_TEXT_RESET Reset;
+    EFI_TEXT_STRING OutputString;
+    VOID *TestString;
+    VOID *QueryMode;
+    VOID *SetMode;
+    VOID *SetAttribute;
+    VOID *ClearScreen;
+    VOID *SetCursorPosition;
+    VOID *EnableCursor;
+    VOID *Mode;
+} EFI_SIMPLE_TEXT_OUTPUT_PROTOCOL;
+
+typedef EFI_STATUS (EFIAPI *EFI_ALLOCATE_PAGES)(EFI_ALLOCATE_TYPE Type, EFI_MEMORY_TYPE MemoryType, UINTN Pages, EFI_PHYSICAL_ADDRESS *Memory);
+typedef EFI_STATUS (EFIAPI *EFI_FREE_PAGES)(EFI_PHYSICAL_ADDRESS Memory, UINTN Pages);
+typedef EFI_STATUS (EFIAPI *EFI_GET_MEMORY_MAP)(UINTN *MemoryMapSize, EFI_MEMORY_DESCRIPTOR *MemoryMap, UINTN *MapKey, UINTN *DescriptorSize, UINT32 *DescriptorVersion);
+typedef EFI_STATUS (EFIAPI *EFI_ALLOCATE_POOL)(EFI_MEMORY_TYPE PoolType, UINTN Size, VOID **Buffer);
+typedef EFI_STATUS (EFIAPI *EFI_FREE_POOL)(VOID *Buffer);
+typedef EFI_STATUS (EFIAPI *EFI_EXIT_BOOT_SERVICES)(EFI_HANDLE ImageHandle, UINTN MapKey);
+
+typedef struct {
+    EFI_TABLE_HEADER Hdr;
+    VOID *RaiseTPL;
+    VOID *RestoreTPL;
+    EFI_ALLOCATE_PAGES AllocatePages;
+    EFI_FREE_PAGES FreePages;
+    EFI_GET_MEMORY_MAP GetMemoryMap;
+    EFI_ALLOCATE_POOL AllocatePool;
+    EFI_FREE_POOL FreePool;
+    VOID *Reserved[18];
+    EFI_EXIT_BOOT_SERVICES ExitBootServices;
+} EFI_BOOT_SERVICES;
+
+typedef struct {
+    EFI_GUID VendorGuid;
+    VOID *VendorTable;
+} EFI_CONFIGURATION_TABLE;
+
+typedef struct {
+    EFI_TABLE_HEADER Hdr;
+    CHAR16 *FirmwareVendor;
+    UINT32 FirmwareRevision;
+    EFI_HANDLE ConsoleInHandle;
+    VOID *ConIn;
+    EFI_HANDLE ConsoleOutHandle;
+    EFI_SIMPLE_TEXT_OUTPUT_PROTOCOL *ConOut;
+    EFI_HANDLE StandardErrorHandle;
+    EFI_SIMPLE_TEXT_OUTPUT_PROTOCOL *StdErr;
+    VOID *RuntimeServices;
+    EFI_BOOT_SERVICES *BootServices;
+    UINTN NumberOfTableEntries;
+    EFI_CONFIGURATION_TABLE *ConfigurationTable;
+} EFI_SYSTEM_TABLE;
+
+#ifdef __cplusplus
+extern "C" {
+#endif
+
+void *memset(void *dest, int value, size_t count);
+void *memcpy(void *dest, const void *src, size_t count);
+void *memmove(void *dest, const void *src, size_t count);
+int memcmp(const void *a, const void *b, size_t count);
+size_t strlen(const char *str);
+
+UINT32 crc32(const VOID *data, UINTN size, UINT32 seed);
+BOOLEAN guid_equal(const EFI_GUID *a, const EFI_GUID *b);
+
+VOID console_init(EFI_SYSTEM_TABLE *system_table);
+UINTN console_printf(const CHAR8 *format, ...);
+
+EFI_STATUS memory_map_load(EFI_BOOT_SERVICES *boot_services, UINTN *map_key);
+UINT64 memory_map_usable_pages(VOID);
+EFI_PHYSICAL_ADDRESS memory_map_find_region(UINT64 pages, EFI_PHYSICAL_ADDRESS below);
+
+VOID heap_init(VOID *base, UINTN size);
+VOID *heap_alloc(UINTN size);
+VOID heap_free(VOID *ptr);
+
+EFI_STATUS paging_identity_map(EFI_PHYSICAL_ADDRESS base, UINT64 length);
+UINT64 paging_root(VOID);
+
+VOID *acpi_find_table(EFI_SYSTEM_TABLE *system_table, const CHAR8 signature[4]);
+
+EFI_STATUS elf_load_image(const VOID *image, UINTN size, UINT64 *entry);
+
+UINTN hal_run(EFI_SYSTEM_TABLE *system_table);
+
+#ifdef __cplusplus
+}
+#endif
+
+#endif
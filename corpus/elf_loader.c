@@ -0,0 +1,89 @@
+#include "efi.h"
+
+#define ELF_MAGIC 0x464C457Fu
+#define ELF_CLASS64 2
+#define ELF_DATA2LSB 1
+#define ELF_MACHINE_X86_64 62
+#define ELF_TYPE_EXEC 2
+#define ELF_TYPE_DYN 3
+#define ELF_PT_LOAD 1
+
+typedef struct {
+    UINT32 e_magic;
+    UINT8 e_class;
+    UINT8 e_data;
+    UINT8 e_version_ident;
+    UINT8 e_pad[9];
+    UINT16 e_type;
+    UINT16 e_machine;
+    UINT32 e_version;
+    UINT64 e_entry;
+    UINT64 e_phoff;
+    UINT64 e_shoff;
+    UINT32 e_flags;
+    UINT16 e_ehsize;
+    UINT16 e_phentsize;
+    UINT16 e_phnum;
+    UINT16 e_shentsize;
+    UINT16 e_shnum;
+    UINT16 e_shstrndx;
+} elf64_header;
+
+typedef struct {
+    UINT32 p_type;
+    UINT32 p_flags;
+    UINT64 p_offset;
+    UINT64 p_vaddr;
+    UINT64 p_paddr;
+    UINT64 p_filesz;
+    UINT64 p_memsz;
+    UINT64 p_align;
+} elf64_phdr;
+
+static EFI_STATUS elf_validate(const elf64_header *header, UINTN size)
+{
+    if (size < sizeof(elf64_header))
+        return EFI_LOAD_ERROR;
+    if (header->e_magic != ELF_MAGIC || header->e_class != ELF_CLASS64 || header->e_data != ELF_DATA2LSB)
+        return EFI_UNSUPPORTED;
+    if (header->e_machine != ELF_MACHINE_X86_64)
+        return EFI_UNSUPPORTED;
+    if (header->e_type != ELF_TYPE_EXEC && header->e_type != ELF_TYPE_DYN)
+        return EFI_UNSUPPORTED;
+    if (header->e_phentsize != sizeof(elf64_phdr))
+        return EFI_LOAD_ERROR;
+    if (header->e_phoff + (UINT64) header->e_phnum * sizeof(elf64_phdr) > size)
+        return EFI_LOAD_ERROR;
+    return EFI_SUCCESS;
+}
+
+static EFI_STATUS elf_load_segment(const UINT8 *image, UINTN size, const elf64_phdr *phdr)
+{
+    if (phdr->p_filesz > phdr->p_memsz || phdr->p_offset + phdr->p_filesz > size)
+        return EFI_LOAD_ERROR;
+
+    UINT8 *dest = (UINT8 *) (UINTN) phdr->p_paddr;
+    memcpy(dest, image + phdr->p_offset, phdr->p_filesz);
+    memset(dest + phdr->p_filesz, 0, phdr->p_memsz - phdr->p_filesz);
+    return paging_identity_map(phdr->p_paddr, phdr->p_memsz);
+}
+
+EFI_STATUS elf_load_image(const VOID *image, UINTN size, UINT64 *entry)
+{
+    const elf64_header *header = (const elf64_header *) image;
+    EFI_STATUS status = elf_validate(header, size);
+
+    if (EFI_ERROR(status))
+        return status;
+
+    const elf64_phdr *phdrs = (const elf64_phdr *) ((const UINT8 *) image + header->e_phoff);
+    for (UINT16 i = 0; i < header->e_phnum; i++) {
+        if (phdrs[i].p_type != ELF_PT_LOAD || phdrs[i].p_memsz == 0)
+            continue;
+        status = elf_load_segment((const UINT8 *) image, size, &phdrs[i]);
+        if (EFI_ERROR(status))
+            return status;
+    }
+    *entry = header->e_entry;
+    return EFI_SUCCESS;
+}
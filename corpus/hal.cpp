@@ -0,0 +1,197 @@
+#include "efi.h"
+
+namespace hal {
+
+template <typename T, UINTN Capacity>
+class ring_buffer {
+public:
+    bool push(const T &value)
+    {
+        if (count_ == Capacity)
+            return false;
+        items_[(head_ + count_) % Capacity] = value;
+        count_++;
+        return true;
+    }
+
+    bool pop(T &value)
+    {
+        if (count_ == 0)
+            return false;
+        value = items_[head_];
+        head_ = (head_ + 1) % Capacity;
+        count_--;
+        return true;
+    }
+
+    UINTN size() const { return count_; }
+
+private:
+    T items_[Capacity];
+    UINTN head_ = 0;
+    UINTN count_ = 0;
+};
+
+template <typename T>
+class span {
+public:
+    span(T *data, UINTN size) : data_(data), size_(size) {}
+
+    T *begin() const { return data_; }
+    T *end() const { return data_ + size_; }
+    UINTN size() const { return size_; }
+    T &operator[](UINTN index) const { return data_[index]; }
+
+private:
+    T *data_;
+    UINTN size_;
+};
+
+template <typename T, typename Less>
+static void sort(span<T> items, Less less)
+{
+    for (UINTN i = 1; i < items.size(); i++) {
+        T value = items[i];
+        UINTN j = i;
+        while (j > 0 && less(value, items[j - 1])) {
+            items[j] = items[j - 1];
+            j--;
+        }
+        items[j] = value;
+    }
+}
+
+struct event {
+    UINT64 timestamp;
+    UINT32 vector;
+    UINT32 cpu;
+};
+
+class device {
+public:
+    explicit device(const CHAR8 *name) : name_(name) {}
+
+    virtual EFI_STATUS probe() = 0;
+    virtual EFI_STATUS handle(const event &e) = 0;
+
+    const CHAR8 *name() const { return name_; }
+    UINT64 handled() const { return handled_; }
+
+protected:
+    void count() { handled_++; }
+
+private:
+    const CHAR8 *name_;
+    UINT64 handled_ = 0;
+};
+
+class timer_device : public device {
+public:
+    timer_device() : device("timer") {}
+
+    EFI_STATUS probe() override
+    {
+        ticks_ = 0;
+        return EFI_SUCCESS;
+    }
+
+    EFI_STATUS handle(const event &e) override
+    {
+        if (e.vector != 32)
+            return EFI_UNSUPPORTED;
+        ticks_ += 1;
+        count();
+        return EFI_SUCCESS;
+    }
+
+private:
+    UINT64 ticks_ = 0;
+};
+
+class keyboard_device : public device {
+public:
+    keyboard_device() : device("keyboard") {}
+
+    EFI_STATUS probe() override { return EFI_SUCCESS; }
+
+    EFI_STATUS handle(const event &e) override
+    {
+        if (e.vector != 33)
+            return EFI_UNSUPPORTED;
+        keys_.push(static_cast<UINT8>(e.timestamp & 0xFF));
+        count();
+        return EFI_SUCCESS;
+    }
+
+private:
+    ring_buffer<UINT8, 64> keys_;
+};
+
+class dispatcher {
+public:
+    bool attach(device *dev)
+    {
+        if (count_ == sizeof(devices_) / sizeof(devices_[0]) || EFI_ERROR(dev->probe()))
+            return false;
+        devices_[count_++] = dev;
+        return true;
+    }
+
+    bool post(const event &e) { return queue_.push(e); }
+
+    UINTN drain()
+    {
+        event pending[32];
+        UINTN count = 0;
+        event e;
+
+        while (count < 32 && queue_.pop(e))
+            pending[count++] = e;
+        sort(span<event>(pending, count), [](const event &a, const event &b) {
+            return a.timestamp < b.timestamp;
+        });
+
+        UINTN handled = 0;
+        for (event &item : span<event>(pending, count)) {
+            for (UINTN i = 0; i < count_; i++) {
+                if (!EFI_ERROR(devices_[i]->handle(item))) {
+                    handled++;
+                    break;
+                }
+            }
+        }
+        return handled;
+    }
+
+private:
+    device *devices_[8] = {};
+    UINTN count_ = 0;
+    ring_buffer<event, 128> queue_;
+};
+
+}
+
+extern "C" void __cxa_pure_virtual()
+{
+    for (;;)
+        ;
+}
+
+extern "C" UINTN hal_run(EFI_SYSTEM_TABLE *system_table)
+{
+    static hal::timer_device timer;
+    static hal::keyboard_device keyboard;
+    static hal::dispatcher dispatcher;
+
+    dispatcher.attach(&timer);
+    dispatcher.attach(&keyboard);
+
+    for (UINT32 i = 0; i < 64; i++)
+        dispatcher.post(hal::event { (i * 7919u) % 101u, 32u + (i & 1u), 0u });
+
+    UINTN handled = dispatcher.drain();
+    console_init(system_table);
+    console_printf("%s: %lu events, %s: %lu events\n",
+                   timer.name(), timer.handled(), keyboard.name(), keyboard.handled());
+    return handled;
+}
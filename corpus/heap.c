@@ -0,0 +1,104 @@
+#include "efi.h"
+
+#define HEAP_ALIGN 16
+#define HEAP_MAGIC 0x48414C39u
+
+typedef struct heap_block {
+    UINT32 magic;
+    UINT32 free;
+    UINTN size;
+    struct heap_block *prev;
+    struct heap_block *next;
+} heap_block;
+
+static heap_block *heap_head;
+
+static UINTN heap_round(UINTN size)
+{
+    return (size + HEAP_ALIGN - 1) & ~(UINTN) (HEAP_ALIGN - 1);
+}
+
+static VOID heap_split(heap_block *block, UINTN size)
+{
+    if (block->size < size + sizeof(heap_block) + HEAP_ALIGN)
+        return;
+
+    heap_block *rest = (heap_block *) ((UINT8 *) (block + 1) + size);
+    rest->magic = HEAP_MAGIC;
+    rest->free = 1;
+    rest->size = block->size - size - sizeof(heap_block);
+    rest->prev = block;
+    rest->next = block->next;
+    if (rest->next)
+        rest->next->prev = rest;
+    block->next = rest;
+    block->size = size;
+}
+
+static heap_block *heap_merge(heap_block *block)
+{
+    if (block->next && block->next->free) {
+        heap_block *next = block->next;
+        block->size += sizeof(heap_block) + next->size;
+        block->next = next->next;
+        if (block->next)
+            block->next->prev = block;
+        next->magic = 0;
+    }
+    if (block->prev && block->prev->free) {
+        heap_block *prev = block->prev;
+        block->magic = 0;
+        prev->size += sizeof(heap_block) + block->size;
+        prev->next = block->next;
+        if (prev->next)
+            prev->next->prev = prev;
+        block = prev;
+    }
+    return block;
+}
+
+VOID heap_init(VOID *base, UINTN size)
+{
+    UINTN start = heap_round((UINTN) base);
+
+    size -= start - (UINTN) base;
+    heap_head = (heap_block *) start;
+    heap_head->magic = HEAP_MAGIC;
+    heap_head->free = 1;
+    heap_head->size = size - sizeof(heap_block);
+    heap_head->prev = NULL;
+    heap_head->next = NULL;
+}
+
+VOID *heap_alloc(UINTN size)
+{
+    heap_block *best = NULL;
+
+    size = heap_round(size ? size : 1);
+    for (heap_block *block = heap_head; block; block = block->next) {
+        if (!block->free || block->size < size)
+            continue;
+        if (!best || block->size < best->size)
+            best = block;
+        if (best->size == size)
+            break;
+    }
+    if (!best)
+        return NULL;
+
+    heap_split(best, size);
+    best->free = 0;
+    return best + 1;
+}
+
+VOID heap_free(VOID *ptr)
+{
+    if (!ptr)
+        return;
+
+    heap_block *block = (heap_block *) ptr - 1;
+    if (block->magic != HEAP_MAGIC || block->free)
+        return;
+    block->free = 1;
+    heap_merge(block);
+}
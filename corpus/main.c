@@ -0,0 +1,46 @@
+#include "efi.h"
+
+#define HEAP_PAGES 256
+
+EFI_STATUS EFIAPI efi_main(EFI_HANDLE image_handle, EFI_SYSTEM_TABLE *system_table)
+{
+    EFI_BOOT_SERVICES *bs = system_table->BootServices;
+    EFI_PHYSICAL_ADDRESS heap = 0;
+    UINTN map_key = 0;
+    EFI_STATUS status;
+
+    console_init(system_table);
+    console_printf("HAL9000 corpus loader, firmware revision %x\n", system_table->FirmwareRevision);
+
+    status = bs->AllocatePages(AllocateAnyPages, EfiLoaderData, HEAP_PAGES, &heap);
+    if (EFI_ERROR(status)) {
+        console_printf("AllocatePages failed: %lx\n", status);
+        return status;
+    }
+    heap_init((VOID *) (UINTN) heap, HEAP_PAGES * EFI_PAGE_SIZE);
+
+    VOID *madt = acpi_find_table(system_table, "APIC");
+    console_printf("MADT at %p, CRC32 %08x\n", madt,
+                   crc32(system_table, sizeof(*system_table), 0));
+
+    status = memory_map_load(bs, &map_key);
+    if (EFI_ERROR(status))
+        return status;
+    console_printf("%lu usable pages\n", memory_map_usable_pages());
+
+    EFI_PHYSICAL_ADDRESS kernel = memory_map_find_region(512, 0x100000000ull);
+    status = paging_identity_map(0, 0x100000000ull);
+    if (EFI_ERROR(status))
+        return status;
+    console_printf("kernel region %lx, page root %lx\n", kernel, paging_root());
+
+    UINT64 entry = 0;
+    VOID *buffer = heap_alloc(EFI_PAGE_SIZE);
+    memset(buffer, 0, EFI_PAGE_SIZE);
+    if (EFI_ERROR(elf_load_image(buffer, EFI_PAGE_SIZE, &entry)))
+        console_printf("no kernel image loaded\n");
+    heap_free(buffer);
+
+    hal_run(system_table);
+    return bs->ExitBootServices(image_handle, map_key);
+}
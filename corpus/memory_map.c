@@ -0,0 +1,124 @@
+#include "efi.h"
+
+#define MEMORY_MAP_ENTRIES 512
+
+static UINT8 memory_map_buffer[MEMORY_MAP_ENTRIES * sizeof(EFI_MEMORY_DESCRIPTOR) * 2];
+static UINTN memory_map_size;
+static UINTN memory_map_descriptor_size;
+
+static EFI_MEMORY_DESCRIPTOR *memory_map_entry(UINTN index)
+{
+    return (EFI_MEMORY_DESCRIPTOR *) (memory_map_buffer + index * memory_map_descriptor_size);
+}
+
+static UINTN memory_map_count(VOID)
+{
+    return memory_map_descriptor_size ? memory_map_size / memory_map_descriptor_size : 0;
+}
+
+static BOOLEAN memory_map_usable(UINT32 type)
+{
+    switch (type) {
+    case EfiLoaderCode:
+    case EfiLoaderData:
+    case EfiBootServicesCode:
+    case EfiBootServicesData:
+    case EfiConventionalMemory:
+        return TRUE;
+    default:
+        return FALSE;
+    }
+}
+
+static VOID memory_map_sort(VOID)
+{
+    UINTN count = memory_map_count();
+    EFI_MEMORY_DESCRIPTOR tmp;
+
+    for (UINTN i = 1; i < count; i++) {
+        memcpy(&tmp, memory_map_entry(i), sizeof(tmp));
+        UINTN j = i;
+        while (j > 0 && memory_map_entry(j - 1)->PhysicalStart > tmp.PhysicalStart) {
+            memcpy(memory_map_entry(j), memory_map_entry(j - 1), sizeof(tmp));
+            j--;
+        }
+        memcpy(memory_map_entry(j), &tmp, sizeof(tmp));
+    }
+}
+
+static VOID memory_map_coalesce(VOID)
+{
+    UINTN count = memory_map_count();
+    UINTN out = 0;
+
+    for (UINTN i = 0; i < count; i++) {
+        EFI_MEMORY_DESCRIPTOR *cur = memory_map_entry(i);
+        if (out > 0) {
+            EFI_MEMORY_DESCRIPTOR *prev = memory_map_entry(out - 1);
+            UINT64 prev_end = prev->PhysicalStart + prev->NumberOfPages * EFI_PAGE_SIZE;
+            if (memory_map_usable(prev->Type) && memory_map_usable(cur->Type) &&
+                prev_end == cur->PhysicalStart && prev->Attribute == cur->Attribute) {
+                prev->NumberOfPages += cur->NumberOfPages;
+                prev->Type = EfiConventionalMemory;
+                continue;
+            }
+        }
+        if (out != i)
+            memcpy(memory_map_entry(out), cur, memory_map_descriptor_size);
+        out++;
+    }
+    memory_map_size = out * memory_map_descriptor_size;
+}
+
+EFI_STATUS memory_map_load(EFI_BOOT_SERVICES *boot_services, UINTN *map_key)
+{
+    UINT32 version;
+    EFI_STATUS status;
+
+    memory_map_size = sizeof(memory_map_buffer);
+    status = boot_services->GetMemoryMap(&memory_map_size,
+                                         (EFI_MEMORY_DESCRIPTOR *) memory_map_buffer,
+                                         map_key,
+                                         &memory_map_descriptor_size,
+                                         &version);
+    if (EFI_ERROR(status))
+        return status;
+    if (memory_map_descriptor_size < sizeof(EFI_MEMORY_DESCRIPTOR))
+        return EFI_UNSUPPORTED;
+
+    memory_map_sort();
+    memory_map_coalesce();
+    return EFI_SUCCESS;
+}
+
+UINT64 memory_map_usable_pages(VOID)
+{
+    UINT64 pages = 0;
+
+    for (UINTN i = 0; i < memory_map_count(); i++) {
+        EFI_MEMORY_DESCRIPTOR *entry = memory_map_entry(i);
+        if (memory_map_usable(entry->Type))
+            pages += entry->NumberOfPages;
+    }
+    return pages;
+}
+
+EFI_PHYSICAL_ADDRESS memory_map_find_region(UINT64 pages, EFI_PHYSICAL_ADDRESS below)
+{
+    EFI_PHYSICAL_ADDRESS best = 0;
+    UINT64 best_pages = ~(UINT64) 0;
+
+    for (UINTN i = 0; i < memory_map_count(); i++) {
+        EFI_MEMORY_DESCRIPTOR *entry = memory_map_entry(i);
+        if (entry->Type != EfiConventionalMemory || entry->NumberOfPages < pages)
+            continue;
+        EFI_PHYSICAL_ADDRESS end = entry->PhysicalStart + pages * EFI_PAGE_SIZE;
+        if (below && end > below)
+            continue;
+        if (entry->NumberOfPages < best_pages) {
+            best = entry->PhysicalStart;
+            best_pages = entry->NumberOfPages;
+        }
+    }
+    return best;
+}
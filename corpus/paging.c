@@ -0,0 +1,86 @@
+#include "efi.h"
+
+#define PAGE_PRESENT (1ull << 0)
+#define PAGE_WRITE (1ull << 1)
+#define PAGE_LARGE (1ull << 7)
+#define PAGE_ADDRESS_MASK 0x000FFFFFFFFFF000ull
+#define PAGE_TABLE_POOL 64
+#define SIZE_2MB (2ull * 1024 * 1024)
+#define SIZE_1GB (1024ull * 1024 * 1024)
+
+typedef UINT64 page_table[512];
+
+static page_table page_pool[PAGE_TABLE_POOL] __attribute__((aligned(EFI_PAGE_SIZE)));
+static UINTN page_pool_used;
+static UINT64 *page_pml4;
+
+static UINT64 *paging_new_table(VOID)
+{
+    if (page_pool_used == PAGE_TABLE_POOL)
+        return NULL;
+    UINT64 *table = page_pool[page_pool_used++];
+    memset(table, 0, sizeof(page_table));
+    return table;
+}
+
+static UINT64 *paging_next(UINT64 *table, UINTN index)
+{
+    if (table[index] & PAGE_PRESENT)
+        return (UINT64 *) (UINTN) (table[index] & PAGE_ADDRESS_MASK);
+
+    UINT64 *next = paging_new_table();
+    if (!next)
+        return NULL;
+    table[index] = ((UINT64) (UINTN) next) | PAGE_PRESENT | PAGE_WRITE;
+    return next;
+}
+
+static EFI_STATUS paging_map_2mb(UINT64 address)
+{
+    UINT64 *pdpt = paging_next(page_pml4, (address >> 39) & 0x1FF);
+    if (!pdpt)
+        return EFI_OUT_OF_RESOURCES;
+    UINT64 *pd = paging_next(pdpt, (address >> 30) & 0x1FF);
+    if (!pd)
+        return EFI_OUT_OF_RESOURCES;
+    pd[(address >> 21) & 0x1FF] = address | PAGE_PRESENT | PAGE_WRITE | PAGE_LARGE;
+    return EFI_SUCCESS;
+}
+
+static EFI_STATUS paging_map_1gb(UINT64 address)
+{
+    UINT64 *pdpt = paging_next(page_pml4, (address >> 39) & 0x1FF);
+    if (!pdpt)
+        return EFI_OUT_OF_RESOURCES;
+    pdpt[(address >> 30) & 0x1FF] = address | PAGE_PRESENT | PAGE_WRITE | PAGE_LARGE;
+    return EFI_SUCCESS;
+}
+
+EFI_STATUS paging_identity_map(EFI_PHYSICAL_ADDRESS base, UINT64 length)
+{
+    EFI_STATUS status = EFI_SUCCESS;
+    UINT64 address = base & ~(SIZE_2MB - 1);
+    UINT64 end = (base + length + SIZE_2MB - 1) & ~(SIZE_2MB - 1);
+
+    if (!page_pml4) {
+        page_pml4 = paging_new_table();
+        if (!page_pml4)
+            return EFI_OUT_OF_RESOURCES;
+    }
+
+    while (address < end && !EFI_ERROR(status)) {
+        if ((address & (SIZE_1GB - 1)) == 0 && end - address >= SIZE_1GB) {
+            status = paging_map_1gb(address);
+            address += SIZE_1GB;
+        } else {
+            status = paging_map_2mb(address);
+            address += SIZE_2MB;
+        }
+    }
+    return status;
+}
+
+UINT64 paging_root(VOID)
+{
+    return (UINT64) (UINTN) page_pml4;
+}
@@ -0,0 +1,83 @@
+#include "efi.h"
+
+void *memset(void *dest, int value, size_t count)
+{
+    UINT8 *d = (UINT8 *) dest;
+    UINT64 pattern = (UINT8) value;
+
+    pattern |= pattern << 8;
+    pattern |= pattern << 16;
+    pattern |= pattern << 32;
+    while (count && ((UINTN) d & 7)) {
+        *d++ = (UINT8) value;
+        count--;
+    }
+    while (count >= 8) {
+        *(volatile UINT64 *) d = pattern;
+        d += 8;
+        count -= 8;
+    }
+    while (count--)
+        *(volatile UINT8 *) d++ = (UINT8) value;
+    return dest;
+}
+
+void *memcpy(void *dest, const void *src, size_t count)
+{
+    UINT8 *d = (UINT8 *) dest;
+    const UINT8 *s = (const UINT8 *) src;
+
+    if ((((UINTN) d | (UINTN) s) & 7) == 0) {
+        while (count >= 8) {
+            *(volatile UINT64 *) d = *(const UINT64 *) s;
+            d += 8;
+            s += 8;
+            count -= 8;
+        }
+    }
+    while (count--)
+        *(volatile UINT8 *) d++ = *s++;
+    return dest;
+}
+
+void *memmove(void *dest, const void *src, size_t count)
+{
+    UINT8 *d = (UINT8 *) dest;
+    const UINT8 *s = (const UINT8 *) src;
+
+    if (d == s || count == 0)
+        return dest;
+    if (d < s || d >= s + count)
+        return memcpy(dest, src, count);
+    d += count;
+    s += count;
+    while (count--)
+        *(volatile UINT8 *) --d = *--s;
+    return dest;
+}
+
+int memcmp(const void *a, const void *b, size_t count)
+{
+    const UINT8 *x = (const UINT8 *) a;
+    const UINT8 *y = (const UINT8 *) b;
+
+    for (size_t i = 0; i < count; i++) {
+        if (x[i] != y[i])
+            return x[i] < y[i] ? -1 : 1;
+    }
+    return 0;
+}
+
+size_t strlen(const char *str)
+{
+    const char *p = str;
+
+    while (*p)
+        p++;
+    return (size_t) (p - str);
+}
+
+BOOLEAN guid_equal(const EFI_GUID *a, const EFI_GUID *b)
+{
+    return memcmp(a, b, sizeof(EFI_GUID)) == 0;
+}